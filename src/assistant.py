@@ -1,8 +1,13 @@
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtGui import QIcon
-from ui import MainWindow
+import json
+import threading
+import multiprocessing
+
+# 设置该环境变量时，窗口首次显示后输出已加载的模块并立即退出，供 startup_benchmark.py 使用
+STARTUP_BENCHMARK_ENV = 'INVASSIST_STARTUP_BENCHMARK'
+# 启动时不应加载的重量级模块
+HEAVY_MODULES = ('fitz', 'PIL', 'tqdm', 'pypinyin')
 
 def resource_path(relative_path):
     """获取资源的绝对路径，兼容开发环境和PyInstaller打包后的环境"""
@@ -12,22 +17,63 @@ def resource_path(relative_path):
     else:
         # 开发环境下的路径
         base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
+
     return os.path.join(base_path, relative_path)
 
+def preload_modules():
+    """窗口显示后在后台线程中预先导入PDF处理模块，缩短首次处理时的等待"""
+    def _import():
+        try:
+            import pdf_merger  # noqa: F401
+        except Exception as e:
+            print(f"预加载模块失败: {e}")
+
+    threading.Thread(target=_import, daemon=True).start()
+
+def report_first_window(app):
+    """输出首个窗口显示时已加载的重量级模块并退出（启动性能测试）"""
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(json.dumps({'heavy_modules': loaded}), flush=True)
+    app.quit()
+
 def main():
     """程序入口函数"""
+    # 打包后的exe中启动工作进程需要
+    multiprocessing.freeze_support()
+
+    # 以 serve 启动时作为常驻的本地处理服务运行
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from service import main as service_main
+        sys.exit(service_main(sys.argv[2:]))
+
+    # 带参数启动时使用命令行模式，不创建窗口
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    # 服务与命令行模式不需要界面，只在启动窗口时导入Qt
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtGui import QIcon
+    from ui import MainWindow
+
     app = QApplication(sys.argv)
-    
+
     # 设置应用程序图标，使用兼容打包环境的路径
     icon_path = resource_path(os.path.join('icon', 'icon.ico'))
     if os.path.exists(icon_path):
         app.setWindowIcon(QIcon(icon_path))
     else:
         print(f"图标文件未找到: {icon_path}")
-    
+
     window = MainWindow()
     window.show()
+
+    # 事件循环开始后（窗口已绘制）再执行
+    if os.environ.get(STARTUP_BENCHMARK_ENV):
+        QTimer.singleShot(0, lambda: report_first_window(app))
+    else:
+        QTimer.singleShot(0, preload_modules)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
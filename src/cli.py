@@ -0,0 +1,125 @@
+import os
+import json
+import argparse
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='发票处理助手（命令行模式）')
+    parser.add_argument('base_folder', help='报销项目文件夹，其中每个子文件夹包含1个发票PDF和至少2张图片')
+    parser.add_argument('-o', '--output', default='', help='输出文件或目录，默认为当前目录')
+    parser.add_argument('--max-size', type=float, default=None,
+                        help='单个输出文件的大小上限（MB），超出时按子文件夹拆分为多个文件')
+    parser.add_argument('--max-pages', type=int, default=None,
+                        help='单个输出文件的页数上限，超出时按子文件夹拆分为多个文件')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='并发处理的工作进程数，大于1时按内存预算调度')
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help='并发处理时的内存预算（MB），默认2048')
+    parser.add_argument('--isolate', action='store_true',
+                        help='在独立的工作进程中处理每个文件夹，超时或崩溃的文件夹记为忽略')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='隔离模式下单个文件夹的处理时限（秒），默认120')
+    parser.add_argument('--memory-limit', type=float, default=None,
+                        help='隔离模式下每个工作进程的内存上限（MB）')
+    parser.add_argument('--summary', action='store_true', help='在输出文件开头插入发票汇总页')
+    parser.add_argument('--place-images', action='store_true',
+                        help='直接将原图放置到页面上（JPEG不重新压缩），画质更好、处理更快')
+    parser.add_argument('--linear', action='store_true', help='保存为线性化（快速网页视图）PDF')
+    parser.add_argument('--update', default=None, metavar='PDF',
+                        help='增量更新已生成的PDF文件，只重新处理新增或发生变化的子文件夹')
+    parser.add_argument('--compact', action='store_true',
+                        help='增量更新时完整重写文件，清除累积的无用对象')
+    parser.add_argument('--server', action='store_true',
+                        help='交给已启动的本地服务处理（见 assistant.py serve），省去启动与预热的开销')
+    parser.add_argument('--overwrite', action='store_true', help='输出文件已存在时直接覆盖')
+    parser.add_argument('--report', default=None,
+                        help='将各文件夹的估算工作量、实测耗时与拟合速率导出为JSON文件')
+    parser.add_argument('--debug', action='store_true', help='输出调试日志')
+    return parser
+
+def run_on_server(args, max_bytes):
+    """将任务提交给本地服务，显示其推送的进度事件"""
+    import urllib.error
+    from service import submit_job, stream_events
+    from progress_model import format_duration
+
+    # 服务进程的工作目录与当前不同，路径需转换为绝对路径
+    params = {
+        'base_folder': os.path.abspath(args.base_folder),
+        'output': os.path.abspath(args.output) if args.output else os.getcwd(),
+        'max_bytes': max_bytes, 'max_pages': args.max_pages,
+        'summary': True if args.summary else None, 'linear': args.linear,
+        'update': os.path.abspath(args.update) if args.update else None,
+        'compact': args.compact, 'overwrite': args.overwrite, 'place_images': args.place_images,
+    }
+    try:
+        job_id = submit_job(params)
+        for event in stream_events(job_id):
+            if event['event'] == 'progress':
+                print(f"已处理: {event['folder']} ({event['done']}/{event['total']})，"
+                      f"预计剩余 {format_duration(event['eta'])}")
+            elif event['event'] == 'report':
+                for folder_data in event['ignored']:
+                    print(f"已忽略 {folder_data[0]}: {folder_data[-1]}")
+                for folder_path, others in event['duplicates']:
+                    print(f"重复发票 {folder_path}: {', '.join(others)}")
+            elif event['event'] == 'done':
+                for output_pdf in event['output_files']:
+                    print(f"成功创建 {output_pdf}")
+                return 0
+            elif event['event'] == 'failed':
+                print(f"处理失败：{event['error']}")
+                return 1
+    except urllib.error.HTTPError as e:
+        print(f"服务拒绝了任务：{json.loads(e.read().decode('utf-8')).get('error', e)}")
+    except (OSError, urllib.error.URLError) as e:
+        print(f"无法连接服务：{e}")
+    return 1
+
+def main(argv=None):
+    """命令行入口函数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.linear and not args.server:
+        from navigation import linearization_available, LINEARIZATION_UNAVAILABLE
+        if not linearization_available():
+            parser.error(LINEARIZATION_UNAVAILABLE)
+    if args.summary and (args.max_size or args.max_pages):
+        parser.error('拆分输出（--max-size/--max-pages）不支持发票汇总页（--summary）')
+    max_bytes = int(args.max_size * 1024 * 1024) if args.max_size else None
+    if args.server:
+        return run_on_server(args, max_bytes)
+
+    from pdf_merger import PDFMerger
+    merger = PDFMerger(debug_mode=args.debug, image_placement=args.place_images)
+    if args.overwrite:
+        merger.overwrite = True
+    memory_budget = int(args.memory_budget * 1024 * 1024) if args.memory_budget else None
+    memory_limit = int(args.memory_limit * 1024 * 1024) if args.memory_limit else None
+    render_options = dict(workers=args.workers, memory_budget=memory_budget,
+                          isolate=args.isolate, timeout=args.timeout, memory_limit=memory_limit)
+    if args.update:
+        try:
+            rendered_count = merger.update_output(args.base_folder, args.update,
+                                                  summary_page=True if args.summary else None,
+                                                  compact=args.compact, **render_options)
+        except (OSError, ValueError) as e:
+            print(f"更新失败：{e}")
+            return 1
+        print(f"已更新 {args.update}：重新处理 {rendered_count} 个文件夹")
+        output_files = [args.update]
+    else:
+        output_files = merger.process_all_subfolders_to_total_pdf(
+            args.base_folder, args.output, max_bytes=max_bytes, max_pages=args.max_pages,
+            summary_page=args.summary, linear=args.linear, **render_options)
+
+    if merger.progress_model is not None:
+        from progress_model import format_duration
+        summary = merger.progress_model.summary()
+        print(f"处理耗时 {format_duration(summary['elapsed_seconds'])}"
+              f"（估算 {format_duration(summary['predicted_total_seconds'])}）")
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    return 0 if output_files else 1
@@ -1,6 +1,95 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from file_utils import log_debug
 
+# 同一文件夹内并发解码和缩放图片的线程数（Pillow解码和缩放时会释放GIL）
+DECODE_THREADS = min(4, os.cpu_count() or 1)
+_executor = None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DECODE_THREADS, thread_name_prefix='decode')
+    return _executor
+
+def _load_resized(img, size):
+    """解码并缩放单张图片，缩放后立即释放原图的像素数据"""
+    if img.format == 'JPEG':
+        # JPEG可在解码时按1/2、1/4、1/8缩小，结果仍不小于目标尺寸
+        img.draft(img.mode, size)
+    resized = img.resize(size, Image.LANCZOS)
+    img.close()
+    return resized
+
+def _load_resized_path(image_path, size):
+    """在工作线程中打开、解码并缩放单张图片"""
+    with Image.open(image_path) as img:
+        return _load_resized(img, size)
+
+def iter_resized_images(image_paths, sizes):
+    """
+    逐张返回缩放后的图片
+
+    最多同时解码 DECODE_THREADS 张图片，调用方处理完一张后才开始解码下一批，
+    峰值内存与图片总数无关。
+
+    Args:
+        image_paths: 图片文件路径列表
+        sizes: 对应的目标尺寸列表
+
+    Yields:
+        缩放后的图像，顺序与输入一致
+    """
+    if len(image_paths) <= 1 or DECODE_THREADS <= 1:
+        for image_path, size in zip(image_paths, sizes):
+            yield _load_resized_path(image_path, size)
+        return
+
+    pending = deque()
+    for image_path, size in zip(image_paths, sizes):
+        pending.append(_get_executor().submit(_load_resized_path, image_path, size))
+        if len(pending) >= DECODE_THREADS:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def resize_images(images, sizes):
+    """
+    并发解码并缩放图片
+
+    Args:
+        images: 已打开（尚未解码）的PIL图像列表
+        sizes: 对应的目标尺寸列表
+
+    Returns:
+        缩放后的图像列表，顺序与输入一致
+    """
+    if len(images) <= 1 or DECODE_THREADS <= 1:
+        return [_load_resized(img, size) for img, size in zip(images, sizes)]
+    return list(_get_executor().map(_load_resized, images, sizes))
+
+def _open_images(image_files):
+    """打开图片文件（只读取文件头），返回 (图片路径列表, 图像列表)，无法打开的图片被跳过"""
+    paths = []
+    images = []
+    for image_file in image_files:
+        try:
+            img = Image.open(image_file)
+            images.append(img)
+            paths.append(image_file)
+        except Exception as e:
+            print(f"打开图片错误 {image_file}: {e}")
+    return paths, images
+
+def _collage_layout(image_sizes, max_width, cell_height):
+    """根据图片数量选择排列方式，返回 (拼图宽度, 拼图高度, [(x, y, 宽, 高)])"""
+    if 2 <= len(image_sizes) <= 4:
+        return _row_layout(image_sizes, max_width, cell_height)
+    else:
+        return _grid_layout(image_sizes, max_width, cell_height)
+
 def create_collage_image(image_files, max_width, cell_height, debug_mode=False):
     """
     创建图片拼贴
@@ -15,88 +104,105 @@ def create_collage_image(image_files, max_width, cell_height, debug_mode=False):
         拼贴好的PIL图像对象，如果没有图片则返回None
     """
     log_debug(f'创建拼图 {image_files} (最大宽度 {max_width}, 单元高度 {cell_height})', debug_mode)
-    images = []
-    for image_file in image_files:
-        try:
-            img = Image.open(image_file)
-            images.append(img)
-        except Exception as e:
-            print(f"打开图片错误 {image_file}: {e}")
+    _, images = _open_images(image_files)
 
     if len(images) == 0:
         return None
 
-    num_images = len(images)
+    collage_width, collage_height, boxes = _collage_layout([img.size for img in images], max_width, cell_height)
+    return _paste_collage(images, collage_width, collage_height, boxes)
 
-    if 2 <= num_images <= 4:
-        return _create_row_collage(images, max_width, cell_height)
-    else:
-        return _create_grid_collage(images, max_width, cell_height)
+def create_collage_layout(image_files, max_width, cell_height, debug_mode=False):
+    """
+    只计算拼图版面，不解码图片，供直接放置原图使用
 
-def _create_row_collage(images, max_width, cell_height):
-    """创建按行排列的拼贴图像"""
-    target_height = cell_height
-    scaled_images = []
-    total_width = 0
+    Args:
+        image_files: 图片文件路径列表
+        max_width: 拼贴最大宽度
+        cell_height: 单元格高度
+        debug_mode: 是否启用调试模式
+
+    Returns:
+        (拼图宽度, 拼图高度, [(图片路径, (x, y, 宽, 高))])，如果没有图片则返回None
+    """
+    log_debug(f'计算拼图版面 {image_files} (最大宽度 {max_width}, 单元高度 {cell_height})', debug_mode)
+    paths, images = _open_images(image_files)
+    sizes = [img.size for img in images]
     for img in images:
-        scale_factor = target_height / img.height
-        new_size = (int(img.width * scale_factor), int(img.height * scale_factor))
-        resized_image = img.resize(new_size, Image.LANCZOS)
-        scaled_images.append(resized_image)
-        total_width += resized_image.width
+        img.close()
+
+    if len(sizes) == 0:
+        return None
+
+    collage_width, collage_height, boxes = _collage_layout(sizes, max_width, cell_height)
+    return collage_width, collage_height, list(zip(paths, boxes))
+
+def _paste_collage(images, collage_width, collage_height, boxes):
+    """按版面并发解码、缩放图片并粘贴到拼图画布"""
+    scaled_images = resize_images(images, [(width, height) for _, _, width, height in boxes])
+    collage_image = Image.new('RGB', (collage_width, collage_height), (255, 255, 255))
+    for img, (x_offset, y_offset, _, _) in zip(scaled_images, boxes):
+        collage_image.paste(img, (x_offset, y_offset))
+    return collage_image
+
+def _row_layout(image_sizes, max_width, cell_height):
+    """计算按行排列时各图片的位置与尺寸"""
+    target_height = cell_height
+    # 根据文件头中的尺寸计算每张图片的最终尺寸
+    sizes = []
+    for width, height in image_sizes:
+        scale_factor = target_height / height
+        sizes.append((int(width * scale_factor), int(height * scale_factor)))
+    total_width = sum(width for width, _ in sizes)
 
     if total_width > max_width:
         scale_factor = max_width / total_width
-        for i in range(len(scaled_images)):
-            new_size = (int(scaled_images[i].width * scale_factor), int(scaled_images[i].height * scale_factor))
-            scaled_images[i] = scaled_images[i].resize(new_size, Image.LANCZOS)
+        sizes = [(int(width * scale_factor), int(height * scale_factor)) for width, height in sizes]
 
-    collage_width = sum(img.width for img in scaled_images)
-    collage_image = Image.new('RGB', (collage_width, target_height), (255, 255, 255))
+    boxes = []
     x_offset = 0
-    for img in scaled_images:
-        collage_image.paste(img, (x_offset, (target_height - img.height) // 2))
-        x_offset += img.width
-        
-    return collage_image
+    for width, height in sizes:
+        boxes.append((x_offset, (target_height - height) // 2, width, height))
+        x_offset += width
+
+    return x_offset, target_height, boxes
 
-def _create_grid_collage(images, max_width, cell_height):
-    """创建网格排列的拼贴图像"""
-    num_images = len(images)
+def _grid_layout(image_sizes, max_width, cell_height):
+    """计算网格排列时各图片的位置与尺寸"""
+    num_images = len(image_sizes)
     images_per_row = 4
     rows_needed = (num_images + images_per_row - 1) // images_per_row
     target_height_per_image = cell_height // rows_needed
     
     # 缩放图像以适应网格
-    scaled_images = []
-    for img in images:
-        scale_factor = target_height_per_image / img.height
-        new_width = int(img.width * scale_factor)
+    sizes = []
+    for width, height in image_sizes:
+        scale_factor = target_height_per_image / height
+        new_width = int(width * scale_factor)
         new_height = target_height_per_image
         
         # 确保每列宽度不超过最大宽度的1/4
         max_col_width = max_width // images_per_row
         if new_width > max_col_width:
             new_width = max_col_width
-            scale_factor = new_width / img.width
-            new_height = int(img.height * scale_factor)
+            scale_factor = new_width / width
+            new_height = int(height * scale_factor)
             
-        scaled_images.append(img.resize((new_width, new_height), Image.LANCZOS))
+        sizes.append((new_width, new_height))
     
     # 计算拼图的总高度
     collage_height = rows_needed * target_height_per_image
-    collage_image = Image.new('RGB', (max_width, collage_height), (255, 255, 255))
     
     # 按照网格排布图像
-    for idx, img in enumerate(scaled_images):
+    boxes = []
+    for idx, (width, height) in enumerate(sizes):
         row = idx // images_per_row
         col = idx % images_per_row
         
         # 计算每张图片在网格中的位置
         cell_width = max_width // images_per_row
-        x_offset = col * cell_width + (cell_width - img.width) // 2  # 居中放置
-        y_offset = row * target_height_per_image + (target_height_per_image - img.height) // 2  # 居中放置
-        
-        collage_image.paste(img, (x_offset, y_offset))
+        x_offset = col * cell_width + (cell_width - width) // 2  # 居中放置
+        y_offset = row * target_height_per_image + (target_height_per_image - height) // 2  # 居中放置
+        boxes.append((x_offset, y_offset, width, height))
         
-    return collage_image
\ No newline at end of file
+    return max_width, collage_height, boxes
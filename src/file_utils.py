@@ -1,6 +1,6 @@
 import os
 import re
-from pypinyin import pinyin, Style as PinyinStyle
+from pinyin_table import first_letter
 
 def windows_sort_key(s):
     """Windows文件排序的键函数，考虑中文拼音"""
@@ -9,10 +9,8 @@ def windows_sort_key(s):
     result = []
     for char in s:
         if '\u4e00' <= char <= '\u9fa5':  # 如果是中文字符
-            # 获取拼音首字母并转小写
-            py = pinyin(char, style=PinyinStyle.FIRST_LETTER)
-            if py:
-                result.append(py[0][0].lower())
+            # 获取拼音首字母（小写）
+            result.append(first_letter(char))
         else:
             # 非中文字符，用自然排序处理
             if char.isdigit():
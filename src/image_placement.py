@@ -0,0 +1,57 @@
+import io
+import fitz  # PyMuPDF
+from PIL import Image
+
+# 版面按300 DPI的像素计算，PDF页面以点（1/72英寸）为单位
+PAGE_SCALE = 72 / 300
+# 无损图片的像素尺寸超过放置尺寸的倍数时，先缩小再嵌入
+MAX_OVERSAMPLE = 2
+
+def pixel_rect(x, y, width, height):
+    """将300 DPI下的像素区域转换为页面坐标"""
+    return fitz.Rect(x * PAGE_SCALE, y * PAGE_SCALE, (x + width) * PAGE_SCALE, (y + height) * PAGE_SCALE)
+
+def new_page(doc, width, height):
+    """在文档末尾添加指定像素尺寸（300 DPI）的空白页面"""
+    return doc.new_page(width=width * PAGE_SCALE, height=height * PAGE_SCALE)
+
+def insert_image_file(page, image_path, box):
+    """
+    将图片文件放置到页面的指定区域
+
+    JPEG的压缩数据原样嵌入，不解码也不重新压缩；PNG只有在像素尺寸远大于放置尺寸时
+    才缩小后重新压缩，其余情况同样直接嵌入原文件。
+
+    Args:
+        page: fitz.Page 对象
+        image_path: 图片文件路径
+        box: 300 DPI下的 (x, y, 宽, 高) 像素区域
+    """
+    x, y, width, height = box
+    if width <= 0 or height <= 0:
+        return
+    rect = pixel_rect(x, y, width, height)
+
+    with Image.open(image_path) as img:
+        if img.format == 'JPEG' or img.width <= width * MAX_OVERSAMPLE:
+            page.insert_image(rect, filename=image_path)
+            return
+        # 缩小到与原拼图方式相同的300 DPI分辨率
+        resized = img.resize((width, height), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    resized.save(buffer, 'PNG', optimize=False)
+    page.insert_image(rect, stream=buffer.getvalue())
+
+def place_collage(page, layout, x_offset, y_offset):
+    """
+    按拼图版面将各图片放置到页面上
+
+    Args:
+        page: fitz.Page 对象
+        layout: create_collage_layout 返回的 (宽, 高, [(图片路径, (x, y, 宽, 高))])
+        x_offset, y_offset: 拼图左上角在页面中的像素位置
+    """
+    _, _, placements = layout
+    for image_path, (x, y, width, height) in placements:
+        insert_image_file(page, image_path, (x_offset + x, y_offset + y, width, height))
@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import hashlib
+import fitz  # PyMuPDF
+from file_utils import log_debug
+
+# 索引跨项目共享，保存在用户目录下
+INDEX_PATH = os.path.join(os.path.expanduser('~'), '.invassist', 'invoice_index.json')
+INDEX_VERSION = 2
+
+NUMBER_PATTERN = re.compile(r'发票号码[:：]?\s*(\d{8,20})')
+# 旧版增值税发票的8位发票号码只在同一发票代码下唯一；全面数字化的电子发票没有发票代码
+CODE_PATTERN = re.compile(r'发票代码[:：]?\s*(\d{10,12})')
+DATE_PATTERN = re.compile(r'开票日期[:：]?\s*(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日')
+AMOUNT_PATTERNS = (
+    re.compile(r'[（(]\s*小写\s*[)）]\s*[¥￥]?\s*(-?[\d,]+\.\d{2})'),
+    re.compile(r'价税合计[^¥￥]*[¥￥]\s*(-?[\d,]+\.\d{2})'),
+)
+NAME_PATTERN = re.compile(r'名\s*称[:：]\s*([^\s:：]+)')
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def parse_invoice_text(text):
+    """
+    从电子发票的文本层中提取发票信息
+
+    Args:
+        text: PDF文本层内容
+
+    Returns:
+        {'code', 'number', 'date', 'amount', 'seller'}，未识别的字段为None
+    """
+    meta = {'code': None, 'number': None, 'date': None, 'amount': None, 'seller': None}
+
+    match = CODE_PATTERN.search(text)
+    if match:
+        meta['code'] = match.group(1)
+
+    match = NUMBER_PATTERN.search(text)
+    if match:
+        meta['number'] = match.group(1)
+
+    match = DATE_PATTERN.search(text)
+    if match:
+        year, month, day = match.groups()
+        meta['date'] = f'{year}-{int(month):02d}-{int(day):02d}'
+
+    for pattern in AMOUNT_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            meta['amount'] = float(match.group(1).replace(',', ''))
+            break
+
+    # 发票上先列购买方再列销售方，取第二个“名称”
+    names = NAME_PATTERN.findall(text)
+    if len(names) >= 2:
+        meta['seller'] = names[1]
+
+    return meta
+
+def extract_invoice_metadata(pdf_path):
+    """读取发票PDF的文本层并提取发票信息"""
+    with fitz.open(pdf_path) as doc:
+        text = '\n'.join(page.get_text() for page in doc)
+    return parse_invoice_text(text)
+
+def read_invoice_metadata(pdf_path, debug_mode=False):
+    """读取发票信息，文件无法解析时返回空的发票信息"""
+    try:
+        return extract_invoice_metadata(pdf_path)
+    except Exception as e:
+        log_debug(f"读取发票信息失败 {pdf_path}: {e}", debug_mode)
+        return parse_invoice_text('')
+
+def invoice_key(meta):
+    """
+    用于判断重复的发票标识：有发票代码时为 (发票代码, 发票号码)，否则为发票号码
+
+    Returns:
+        标识字符串，未识别出发票号码时为None
+    """
+    if not meta.get('number'):
+        return None
+    if meta.get('code'):
+        return f"{meta['code']}-{meta['number']}"
+    return meta['number']
+
+def describe_invoice(meta):
+    """提示重复发票时显示的发票标识"""
+    number = meta.get('number') or '未识别'
+    if meta.get('code'):
+        return f"发票代码 {meta['code']} 发票号码 {number}"
+    return f"发票号码 {number}"
+
+class InvoiceIndex:
+    """
+    以文件哈希为键的发票信息索引
+
+    同一文件在任意项目中只解析一次，并记录每个文件路径对应的哈希，用于跨文件夹、跨项目查找重复发票。
+    """
+
+    def __init__(self, path=None, debug_mode=False):
+        self.path = path or INDEX_PATH
+        self.debug_mode = debug_mode
+        self.invoices = {}  # 文件哈希 -> 发票信息
+        self.paths = {}  # 文件路径 -> 文件哈希
+        self._by_key = {}  # 发票标识（发票代码与号码） -> 文件哈希集合
+        self._by_digest = {}  # 文件哈希 -> 文件路径集合
+        self.load()
+
+    def load(self):
+        """从磁盘读取索引"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log_debug(f"未读取到发票索引 {self.path}: {e}", self.debug_mode)
+            return self
+
+        if data.get('version') == INDEX_VERSION:
+            self.invoices = data.get('invoices', {})
+            self.paths = data.get('paths', {})
+        self._rebuild_maps()
+        return self
+
+    def save(self):
+        """将索引写入磁盘"""
+        data = {'version': INDEX_VERSION, 'invoices': self.invoices, 'paths': self.paths}
+        tmp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log_debug(f"保存发票索引失败 {self.path}: {e}", self.debug_mode)
+
+    def _rebuild_maps(self):
+        self._by_key = {}
+        for digest, meta in self.invoices.items():
+            key = invoice_key(meta)
+            if key:
+                self._by_key.setdefault(key, set()).add(digest)
+        self._by_digest = {}
+        for path, digest in self.paths.items():
+            self._by_digest.setdefault(digest, set()).add(path)
+
+    def index_file(self, pdf_path, digest=None, meta=None):
+        """
+        获取发票文件的信息，已索引过的文件内容不会重复解析
+
+        Args:
+            pdf_path: 发票PDF路径
+            digest: 已知的文件哈希，为None时重新计算
+            meta: 已在工作进程中读取的发票信息，索引中没有该文件时使用，为None时在当前进程中读取
+
+        Returns:
+            (文件哈希, 发票信息)
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        if digest is None:
+            digest = file_hash(pdf_path)
+
+        if digest in self.invoices:
+            meta = self.invoices[digest]
+        else:
+            if meta is None:
+                meta = read_invoice_metadata(pdf_path, self.debug_mode)
+            self.invoices[digest] = meta
+            key = invoice_key(meta)
+            if key:
+                self._by_key.setdefault(key, set()).add(digest)
+
+        old_digest = self.paths.get(pdf_path)
+        if old_digest is not None and old_digest != digest:
+            # 文件内容已变化
+            self._by_digest.get(old_digest, set()).discard(pdf_path)
+        self.paths[pdf_path] = digest
+        self._by_digest.setdefault(digest, set()).add(pdf_path)
+        return digest, meta
+
+    def duplicates_of(self, pdf_path):
+        """
+        查找与指定发票重复的其他文件：内容相同，或发票代码与号码相同
+
+        Returns:
+            其他仍然存在的文件路径列表
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        digest = self.paths.get(pdf_path)
+        if digest is None:
+            return []
+
+        key = invoice_key(self.invoices[digest])
+        digests = self._by_key.get(key, set()) if key else {digest}
+        duplicates = []
+        for other_digest in digests:
+            for other_path in list(self._by_digest.get(other_digest, ())):
+                if other_path == pdf_path:
+                    continue
+                if not os.path.exists(other_path):
+                    # 文件已删除或移动，清理过期记录
+                    self._by_digest[other_digest].discard(other_path)
+                    self.paths.pop(other_path, None)
+                    continue
+                duplicates.append(other_path)
+        return sorted(duplicates)
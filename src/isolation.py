@@ -0,0 +1,216 @@
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+# 单个子文件夹的默认处理时限（秒）
+DEFAULT_TIMEOUT = 120
+# 工作进程启动并完成库导入的时限（秒），不计入单个文件夹的处理时限
+STARTUP_TIMEOUT = 60
+
+class FolderTimeoutError(Exception):
+    """子文件夹处理超时"""
+
+class WorkerCrashedError(Exception):
+    """工作进程异常退出"""
+
+def _apply_memory_limit(memory_limit):
+    """限制当前进程可使用的内存（字节）"""
+    if not memory_limit:
+        return
+    if sys.platform == 'win32':
+        _apply_windows_job_limit(memory_limit)
+    else:
+        import resource
+        # POSIX 下限制的是虚拟地址空间，需要为解释器和库预留余量
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+def _apply_windows_job_limit(memory_limit):
+    """通过作业对象限制当前进程的提交内存"""
+    import ctypes
+    from ctypes import wintypes
+
+    class IO_COUNTERS(ctypes.Structure):
+        _fields_ = [(name, ctypes.c_ulonglong) for name in (
+            'ReadOperationCount', 'WriteOperationCount', 'OtherOperationCount',
+            'ReadTransferCount', 'WriteTransferCount', 'OtherTransferCount')]
+
+    class JOBOBJECT_BASIC_LIMIT_INFORMATION(ctypes.Structure):
+        _fields_ = [
+            ('PerProcessUserTimeLimit', ctypes.c_int64),
+            ('PerJobUserTimeLimit', ctypes.c_int64),
+            ('LimitFlags', wintypes.DWORD),
+            ('MinimumWorkingSetSize', ctypes.c_size_t),
+            ('MaximumWorkingSetSize', ctypes.c_size_t),
+            ('ActiveProcessLimit', wintypes.DWORD),
+            ('Affinity', ctypes.c_size_t),
+            ('PriorityClass', wintypes.DWORD),
+            ('SchedulingClass', wintypes.DWORD),
+        ]
+
+    class JOBOBJECT_EXTENDED_LIMIT_INFORMATION(ctypes.Structure):
+        _fields_ = [
+            ('BasicLimitInformation', JOBOBJECT_BASIC_LIMIT_INFORMATION),
+            ('IoInfo', IO_COUNTERS),
+            ('ProcessMemoryLimit', ctypes.c_size_t),
+            ('JobMemoryLimit', ctypes.c_size_t),
+            ('PeakProcessMemoryUsed', ctypes.c_size_t),
+            ('PeakJobMemoryUsed', ctypes.c_size_t),
+        ]
+
+    JOB_OBJECT_LIMIT_PROCESS_MEMORY = 0x100
+    JOB_OBJECT_EXTENDED_LIMIT_INFORMATION_CLASS = 9
+
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+
+    job = kernel32.CreateJobObjectW(None, None)
+    info = JOBOBJECT_EXTENDED_LIMIT_INFORMATION()
+    info.BasicLimitInformation.LimitFlags = JOB_OBJECT_LIMIT_PROCESS_MEMORY
+    info.ProcessMemoryLimit = memory_limit
+    if not job or not kernel32.SetInformationJobObject(
+            job, JOB_OBJECT_EXTENDED_LIMIT_INFORMATION_CLASS, ctypes.byref(info), ctypes.sizeof(info)):
+        raise OSError(ctypes.get_last_error(), "设置作业对象内存限制失败")
+    if not kernel32.AssignProcessToJobObject(job, kernel32.GetCurrentProcess()):
+        raise OSError(ctypes.get_last_error(), "将工作进程加入作业对象失败")
+
+def _worker_main(conn, memory_limit):
+    """工作进程入口：预先导入处理模块，然后循环执行收到的任务"""
+    try:
+        _apply_memory_limit(memory_limit)
+    except Exception as e:
+        print(f"设置内存限制失败: {e}")
+    import pdf_merger  # noqa: F401  预热，避免计入首个任务的处理时限
+    conn.send(('ready', None))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        fn, args = job
+        try:
+            result = ('ok', fn(*args))
+        except MemoryError:
+            result = ('error', '超出内存限制')
+        except Exception as e:
+            result = ('error', str(e))
+        conn.send(result)
+
+class IsolatedWorker:
+    """
+    在独立进程中执行任务的工作者
+
+    任务超时或进程崩溃时结束该进程，下一个任务会自动启动新的进程。
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, memory_limit=None):
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.process = None
+        self.conn = None
+
+    def _start(self):
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, self.memory_limit), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        if not self.conn.poll(STARTUP_TIMEOUT):
+            self.kill()
+            raise WorkerCrashedError(f"工作进程启动超时（{STARTUP_TIMEOUT}秒）")
+        try:
+            self.conn.recv()
+        except EOFError:
+            self._raise_crashed()
+
+    def _raise_crashed(self):
+        self.process.join(1)
+        exitcode = self.process.exitcode
+        self.kill()
+        raise WorkerCrashedError(f"工作进程异常退出（退出码 {exitcode}）")
+
+    def call(self, fn, *args):
+        """在工作进程中执行 fn(*args)，超时、崩溃或出错时抛出异常"""
+        if self.process is None or not self.process.is_alive():
+            self._start()
+
+        self.conn.send((fn, args))
+        # 进程退出时 poll 同样会立即返回，随后 recv 抛出 EOFError
+        if not self.conn.poll(self.timeout):
+            self.kill()
+            raise FolderTimeoutError(f"处理超时（{self.timeout}秒）")
+        try:
+            status, value = self.conn.recv()
+        except EOFError:
+            self._raise_crashed()
+
+        if status == 'error':
+            raise RuntimeError(value)
+        return value
+
+    def kill(self):
+        """结束工作进程"""
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join()
+            self.process = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def close(self):
+        """通知工作进程退出"""
+        if self.process is not None and self.process.is_alive():
+            try:
+                self.conn.send(None)
+                self.process.join(5)
+            except OSError:
+                pass
+        self.kill()
+
+class IsolatedExecutor:
+    """
+    与 concurrent.futures 执行器接口兼容的隔离执行器
+
+    每个线程持有一个独立的工作进程，单个任务的超时或崩溃只影响该任务本身。
+    """
+
+    def __init__(self, max_workers=1, timeout=DEFAULT_TIMEOUT, memory_limit=None):
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._local = threading.local()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _call(self, fn, args):
+        worker = getattr(self._local, 'worker', None)
+        if worker is None:
+            worker = IsolatedWorker(self.timeout, self.memory_limit)
+            self._local.worker = worker
+            with self._lock:
+                self._workers.append(worker)
+        return worker.call(fn, *args)
+
+    def submit(self, fn, *args):
+        return self._pool.submit(self._call, fn, args)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
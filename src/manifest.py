@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import hashlib
+from file_utils import windows_sort_key, log_debug
+
+# 清单文件保存在报销项目文件夹内
+MANIFEST_FILENAME = '.invassist_manifest.json'
+MANIFEST_VERSION = 1
+
+PDF_EXTENSIONS = ('.pdf',)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# 部分文件系统（如FAT32）的修改时间精度只有2秒，在此窗口内修改的目录下次扫描时仍需重新列举
+MTIME_GRANULARITY_NS = 2 * 1000 * 1000 * 1000
+
+def classify_files(files):
+    """
+    按文件名对子文件夹中的文件进行分类
+
+    Args:
+        files: 文件名列表（保持目录列举顺序）
+
+    Returns:
+        包含 pdf_files、newline_images、newpage_images、other_images 的字典
+    """
+    pdf_files = [f for f in files if f.lower().endswith(PDF_EXTENSIONS)]
+    image_files = [f for f in files if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+    # 筛选 NEWPAGE 和 NEWLINE 图片
+    newline_images = [f for f in image_files if f.startswith('NEWLINE')]
+    newpage_images = [f for f in image_files if f.startswith('NEWPAGE')]
+    other_images = [f for f in image_files if f not in newline_images and f not in newpage_images]
+
+    return {
+        'pdf_files': pdf_files,
+        'newline_images': newline_images,
+        'newpage_images': newpage_images,
+        'other_images': other_images,
+    }
+
+def scan_folder(folder_path, dir_stat=None):
+    """
+    扫描单个子文件夹，生成包含文件清单、状态签名、分类和校验结果的条目
+
+    Args:
+        folder_path: 子文件夹路径
+        dir_stat: 已获取的目录 stat 结果，为 None 时重新获取
+
+    Returns:
+        条目字典
+    """
+    if dir_stat is None:
+        dir_stat = os.stat(folder_path)
+
+    files = {}
+    names = []
+    with os.scandir(folder_path) as it:
+        for item in it:
+            if not item.is_file():
+                continue
+            st = item.stat()
+            files[item.name] = [st.st_size, st.st_mtime_ns]
+            names.append(item.name)
+
+    entry = {
+        'name': os.path.basename(folder_path),
+        'mtime_ns': dir_stat.st_mtime_ns,
+        'scanned_ns': time.time_ns(),
+        'files': files,
+    }
+    entry.update(classify_files(names))
+
+    # 校验规则：恰好1个PDF，且至少2张非 NEWLINE/NEWPAGE 图片
+    entry['pdf_count'] = len(entry['pdf_files'])
+    entry['img_count'] = len(entry['other_images'])
+    entry['valid'] = entry['pdf_count'] == 1 and entry['img_count'] >= 2
+    return entry
+
+def entry_fingerprint(entry):
+    """根据文件清单（名称、大小、修改时间）生成子文件夹内容的指纹"""
+    data = json.dumps(sorted(entry['files'].items()), ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+def entry_paths(folder_path, entry, key):
+    """获取条目中某一类文件的完整路径列表"""
+    return [os.path.join(folder_path, f) for f in entry[key]]
+
+class ProjectManifest:
+    """
+    报销项目的持久化清单
+
+    记录每个子文件夹的文件清单与校验结果，保存在项目文件夹中。
+    再次扫描时只对目录修改时间发生变化的子文件夹重新列举文件。
+    """
+
+    def __init__(self, base_folder, debug_mode=False):
+        self.base_folder = os.path.abspath(base_folder)
+        self.path = os.path.join(self.base_folder, MANIFEST_FILENAME)
+        self.debug_mode = debug_mode
+        self.entries = {}  # 子文件夹名称 -> 条目
+        self.order = []  # 按Windows排序规则排列的子文件夹名称
+        self.changed = []  # 最近一次扫描中新增或变化的子文件夹名称
+        self.removed = []  # 最近一次扫描中已删除的子文件夹名称
+        self._loaded = False
+
+    def load(self):
+        """从磁盘读取清单，文件不存在或版本不符时视为空清单"""
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log_debug(f"未读取到项目清单 {self.path}: {e}", self.debug_mode)
+            return self
+
+        if data.get('version') != MANIFEST_VERSION:
+            log_debug(f"项目清单版本不符，将重新扫描: {self.path}", self.debug_mode)
+            return self
+
+        self.entries = data.get('entries', {})
+        self.order = [name for name in data.get('order', []) if name in self.entries]
+        return self
+
+    def save(self):
+        """将清单写入磁盘（先写临时文件再替换，避免写入中断导致文件损坏）"""
+        data = {
+            'version': MANIFEST_VERSION,
+            'order': self.order,
+            'entries': self.entries,
+        }
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # 只读目录等情况下不影响正常使用
+            log_debug(f"保存项目清单失败 {self.path}: {e}", self.debug_mode)
+
+    def _is_unchanged(self, entry, dir_stat):
+        """判断缓存条目是否仍然有效"""
+        if entry.get('mtime_ns') != dir_stat.st_mtime_ns:
+            return False
+        # 扫描时间过于接近目录修改时间时，无法确认扫描后没有再次修改
+        return entry.get('scanned_ns', 0) - dir_stat.st_mtime_ns > MTIME_GRANULARITY_NS
+
+    def scan(self, verify_files=False):
+        """
+        扫描项目文件夹，更新变化的子文件夹条目并保存清单
+
+        Args:
+            verify_files: 是否对目录修改时间未变化的子文件夹也重新检查文件，
+                用于发现原地覆盖等不会改变目录修改时间的文件修改
+
+        Returns:
+            self，便于链式调用
+        """
+        if not self._loaded:
+            self.load()
+
+        entries = {}
+        changed = []
+        touched = False
+        with os.scandir(self.base_folder) as it:
+            for item in it:
+                if not item.is_dir():
+                    continue
+                dir_stat = item.stat()
+                old_entry = self.entries.get(item.name)
+                if old_entry is not None and not verify_files and self._is_unchanged(old_entry, dir_stat):
+                    entries[item.name] = old_entry
+                    continue
+                try:
+                    entry = scan_folder(item.path, dir_stat)
+                except OSError as e:
+                    log_debug(f"扫描文件夹错误 {item.path}: {e}", self.debug_mode)
+                    continue
+                if old_entry is not None and old_entry['files'] == entry['files']:
+                    # 文件未变化，保留缓存的处理开销与发票哈希
+                    touched = touched or old_entry['mtime_ns'] != entry['mtime_ns']
+                    old_entry['mtime_ns'] = entry['mtime_ns']
+                    old_entry['scanned_ns'] = entry['scanned_ns']
+                    entries[item.name] = old_entry
+                    continue
+                entries[item.name] = entry
+                changed.append(item.name)
+
+        self.removed = [name for name in self.entries if name not in entries]
+        self.changed = changed
+        self.entries = entries
+        if changed or self.removed:
+            # 按照Windows的排序规则（包括中文拼音）对子文件夹进行排序
+            self.order = sorted(entries, key=windows_sort_key)
+            self.save()
+            log_debug(f"项目清单已更新: {len(changed)} 个变化, {len(self.removed)} 个删除", self.debug_mode)
+        elif touched:
+            self.save()
+
+        return self
+
+    def folder_path(self, name):
+        """获取子文件夹的完整路径"""
+        return os.path.join(self.base_folder, name)
+
+    def folder_entries(self):
+        """按顺序返回 (子文件夹路径, 条目) 列表"""
+        return [(self.folder_path(name), self.entries[name]) for name in self.order]
+
+    def stats(self):
+        """返回 (符合条件的文件夹数, 总文件夹数)"""
+        valid_count = sum(1 for name in self.order if self.entries[name]['valid'])
+        return valid_count, len(self.order)
@@ -0,0 +1,127 @@
+import os
+import json
+import shutil
+import subprocess
+import importlib.util
+from file_utils import log_debug
+
+# 文档目录（Catalog）中记录各部分页码范围的键
+SECTIONS_KEY = 'InvAssistSections'
+
+def apply_navigation(doc, sections):
+    """
+    为输出文档添加书签与页码标签
+
+    每个部分（汇总页或子文件夹）生成一个一级书签，页码标签显示为“部分名称-页码”。
+
+    Args:
+        doc: 总文档
+        sections: [(标题, 起始页（从0开始）, 页数, ...)] 列表，按页码顺序排列
+    """
+    sections = [section[:3] for section in sections if section[2] > 0]
+    doc.set_toc([[1, title, start + 1] for title, start, _ in sections])
+    set_page_labels(doc, [(start, f'{title}-') for title, start, _ in sections])
+
+def pdf_text_string(text):
+    """将文本编码为带BOM的UTF-16BE十六进制PDF字符串，保证中文在各阅读器中正确显示"""
+    return '<FEFF' + text.encode('utf-16-be').hex().upper() + '>'
+
+def set_page_labels(doc, labels):
+    """
+    设置页码标签（十进制页码，每个部分从1开始）
+
+    PyMuPDF 的 set_page_labels 将前缀按原始UTF-8字节写入，中文前缀会显示为乱码，
+    因此直接在文档目录中写入 /PageLabels 数字树。
+
+    Args:
+        doc: 总文档
+        labels: [(起始页（从0开始）, 前缀)] 列表，按页码顺序排列
+    """
+    catalog = doc.pdf_catalog()
+    if not labels:
+        doc.xref_set_key(catalog, 'PageLabels', 'null')
+        return
+    nums = ''.join(f'{start}<</S/D/P{pdf_text_string(prefix)}/St 1>>' for start, prefix in labels)
+    doc.xref_set_key(catalog, 'PageLabels', f'<</Nums[{nums}]>>')
+
+def write_section_records(doc, records):
+    """
+    将各部分的页码范围记录写入文档，供之后增量更新时定位页面
+
+    Args:
+        doc: 总文档
+        records: [{'folder': 子文件夹名称（汇总页为None）, 'start': 起始页, 'count': 页数, 'fingerprint': 内容指纹}]
+    """
+    data = json.dumps(records, ensure_ascii=False).encode('utf-8')
+    catalog = doc.pdf_catalog()
+    key_type, value = doc.xref_get_key(catalog, SECTIONS_KEY)
+    if key_type == 'xref':
+        xref = int(value.split()[0])
+    else:
+        xref = doc.get_new_xref()
+        doc.update_object(xref, '<<>>')
+        doc.xref_set_key(catalog, SECTIONS_KEY, f'{xref} 0 R')
+    doc.update_stream(xref, data)
+
+def read_section_records(doc):
+    """读取文档中的页码范围记录，不存在时返回None"""
+    key_type, value = doc.xref_get_key(doc.pdf_catalog(), SECTIONS_KEY)
+    if key_type != 'xref':
+        return None
+    try:
+        return json.loads(doc.xref_stream(int(value.split()[0])).decode('utf-8'))
+    except (ValueError, TypeError):
+        return None
+
+# 保存输出文件时的参数；直接放置的PNG等图片在文档中以未压缩的像素保存，必须在保存时压缩
+SAVE_OPTIONS = {'garbage': 3, 'deflate': True, 'deflate_images': True, 'deflate_fonts': True}
+# 工作进程传回单个文件夹的文档时只压缩，不做耗时的对象清理
+TRANSFER_OPTIONS = {'deflate': True, 'deflate_images': True}
+
+# PyMuPDF 1.24 起不再支持线性化保存，改由 pikepdf 或 qpdf 完成
+LINEARIZATION_UNAVAILABLE = '保存为快速网页视图需要安装 pikepdf（pip install pikepdf）或 qpdf 命令'
+
+def linearization_available():
+    """是否可以保存线性化PDF（只检查依赖是否存在，不导入）"""
+    return importlib.util.find_spec('pikepdf') is not None or shutil.which('qpdf') is not None
+
+def _linearize(source_path, output_path):
+    """将PDF文件线性化后写入输出路径"""
+    try:
+        import pikepdf
+    except ImportError:
+        result = subprocess.run([shutil.which('qpdf'), '--linearize', source_path, output_path],
+                                capture_output=True, text=True)
+        # 退出码3表示成功但有警告
+        if result.returncode not in (0, 3):
+            raise RuntimeError(f"qpdf 线性化失败: {result.stderr.strip()}")
+        return
+    with pikepdf.open(source_path) as pdf:
+        pdf.save(output_path, linearize=True)
+
+def save_pdf(doc, output_path, linear=False, debug_mode=False, **options):
+    """
+    保存PDF文件
+
+    Args:
+        doc: 要保存的文档
+        output_path: 输出路径
+        linear: 是否保存为线性化（快速网页视图）PDF，便于浏览器中先显示首页
+        options: 传递给 doc.save 的其他参数
+
+    Raises:
+        RuntimeError: 要求线性化但没有可用的线性化工具
+    """
+    if not linear:
+        doc.save(output_path, **options)
+        return
+    if not linearization_available():
+        raise RuntimeError(LINEARIZATION_UNAVAILABLE)
+
+    tmp_path = output_path + '.tmp'
+    doc.save(tmp_path, **options)
+    try:
+        _linearize(tmp_path, output_path)
+        log_debug(f"已保存线性化PDF: {output_path}", debug_mode)
+    finally:
+        os.remove(tmp_path)
@@ -1,10 +1,18 @@
+import io
 import os
 import fitz  # PyMuPDF
 from PIL import Image
 import datetime
-from tqdm import tqdm
+import time
+from contextlib import contextmanager, ExitStack
 from file_utils import windows_sort_key, log_debug
-from collage_creator import create_collage_image
+from collage_creator import create_collage_image, create_collage_layout, iter_resized_images
+from manifest import ProjectManifest, scan_folder, entry_paths, entry_fingerprint
+from split_writer import SplitPDFWriter
+from raster_bridge import render_page_to_width
+from image_placement import new_page, pixel_rect, insert_image_file, place_collage
+from navigation import (apply_navigation, save_pdf, write_section_records, read_section_records,
+                        SAVE_OPTIONS, TRANSFER_OPTIONS)
 
 # 初始化colorama
 # init()
@@ -20,11 +28,21 @@ CONTENT_HEIGHT = A4_HEIGHT - 2 * MARGIN  # 3272
 HEIGHT_THRESHOLD = CONTENT_HEIGHT * 0.7  # 内容区域高度的70%
 
 class PDFMerger:
-    def __init__(self, debug_mode=False):
+    def __init__(self, debug_mode=False, image_placement=False):
         self.debug_mode = debug_mode
+        # 直接放置原图（JPEG不重新压缩），不再将整页合成为一张图片
+        self.image_placement = image_placement
         self.folder_count = 0
         self.success_folders = []
         self.ignored_folders = []
+        self.invoice_records = {}  # 子文件夹路径 -> (发票信息, 重复的其他发票路径列表)
+        self.sections = []  # 输出文档中各部分的 (标题, 起始页, 页数, 子文件夹路径)，汇总页的路径为None
+        self.fingerprints = {}  # 子文件夹路径 -> 处理时的内容指纹，用于之后增量更新
+        self.stage_timings = {}  # 子文件夹路径 -> {处理阶段: 耗时（秒）}
+        self.progress_model = None  # 最近一次处理的进度估算模型
+        # 设置后以 (子文件夹路径, 已处理数, 总数) 调用，代替命令行进度条（界面与服务模式使用）
+        self.progress_callback = None
+        self.overwrite = None  # 输出文件已存在时：None 在命令行询问，True 直接覆盖，False 取消
 
     def create_document(self):
         """创建一个新的PDF文档"""
@@ -34,36 +52,51 @@ class PDFMerger:
         """获取当前时间戳"""
         return datetime.datetime.now().strftime("%Y%m%d%H%M%S")
 
-    def merge_invoice_and_images_to_total_pdf(self, folder_path, doc):
-        """合并单个文件夹中的发票PDF和图片至总文档"""
+    def merge_invoice_and_images_to_total_pdf(self, folder_path, doc, entry=None):
+        """
+        合并单个文件夹中的发票PDF和图片至总文档
+
+        Args:
+            folder_path: 子文件夹路径
+            doc: 总文档
+            entry: 项目清单中该文件夹的条目，为 None 时重新扫描
+        """
         try:
             log_debug(f"\n正在处理文件夹: {folder_path}", self.debug_mode)
-            files = os.listdir(folder_path)
-            pdf_files = [os.path.join(folder_path, f) for f in files if f.lower().endswith('.pdf')]
-            image_files = [os.path.join(folder_path, f) for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-
-            # 筛选 NEWPAGE 和 NEWLINE 图片
-            newline_images = [f for f in image_files if os.path.basename(f).startswith('NEWLINE')]
-            newpage_images = [f for f in image_files if os.path.basename(f).startswith('NEWPAGE')]
-            other_images = [f for f in image_files if f not in newline_images and f not in newpage_images]
+            if entry is None:
+                entry = scan_folder(folder_path)
+            pdf_files = entry_paths(folder_path, entry, 'pdf_files')
+            newline_images = entry_paths(folder_path, entry, 'newline_images')
+            newpage_images = entry_paths(folder_path, entry, 'newpage_images')
+            other_images = entry_paths(folder_path, entry, 'other_images')
 
-            if len(pdf_files) != 1 or len(other_images) < 2:
+            if not entry['valid']:
                 # 修改存储结构，保存PDF和图片数量信息
                 reason = f"仅找到 {len(pdf_files)} 个 PDF 文件与 {len(other_images)} 个图片文件."
                 self.ignored_folders.append((folder_path, len(pdf_files), len(other_images), reason))
                 log_debug(f"Ignored {folder_path}: {reason}", self.debug_mode)
                 return 0
 
+            # 记录各阶段耗时，用于修正进度估算
+            timings = {}
+            stage_start = time.perf_counter()
+
             invoice_pdf_path = pdf_files[0]
             invoice_doc = fitz.open(invoice_pdf_path)
             
             # 检查PDF页数
             pdf_page_count = len(invoice_doc)
             
-            if pdf_page_count > 1:
+            if self.image_placement:
+                stage_start = self._place_invoice_and_collage(invoice_doc, other_images, doc, timings, stage_start)
+                if stage_start is None:
+                    return 0
+            elif pdf_page_count > 1:
                 # 多页PDF，直接整个插入
                 log_debug(f"处理多页PDF（{pdf_page_count}页）: {invoice_pdf_path}", self.debug_mode)
                 doc.insert_pdf(invoice_doc)
+                timings['invoice'] = time.perf_counter() - stage_start
+                stage_start = time.perf_counter()
                 
                 # 为多页PDF创建独立的拼图页
                 collage_image = create_collage_image(other_images, CONTENT_WIDTH, CONTENT_HEIGHT, self.debug_mode)
@@ -74,22 +107,16 @@ class PDFMerger:
                     collage_x_offset = (A4_WIDTH - collage_image.width) // 2
                     collage_y_offset = (A4_HEIGHT - collage_image.height) // 2
                     collage_page.paste(collage_image, (collage_x_offset, collage_y_offset))
-                    collage_pdf_path = os.path.join(folder_path, 'collage_page.pdf')
-                    collage_page.save(collage_pdf_path, 'PDF', resolution=300.0)
-                    doc.insert_pdf(fitz.open(collage_pdf_path))
-                    os.remove(collage_pdf_path)
+                    self._insert_image_page(doc, collage_page)
             else:
                 # 单页PDF，按原逻辑处理
                 invoice_page = invoice_doc.load_page(0)
                 
-                scale = 5
-                matrix = fitz.Matrix(scale, scale)
-                pix = invoice_page.get_pixmap(matrix=matrix)
-                invoice_image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        
-                scale_factor = CONTENT_WIDTH / invoice_image.width
-                new_height = int(invoice_image.height * scale_factor)
-                resized_invoice_image = invoice_image.resize((CONTENT_WIDTH, new_height), Image.LANCZOS)
+                # 直接按内容区宽度渲染发票
+                resized_invoice_image = render_page_to_width(invoice_page, CONTENT_WIDTH)
+                new_height = resized_invoice_image.height
+                timings['invoice'] = time.perf_counter() - stage_start
+                stage_start = time.perf_counter()
         
                 remaining_space = CONTENT_HEIGHT - resized_invoice_image.height
                 create_new_page_for_collage = resized_invoice_image.height > HEIGHT_THRESHOLD
@@ -107,35 +134,31 @@ class PDFMerger:
                 if create_new_page_for_collage:
                     merged_image = Image.new('RGB', (A4_WIDTH, A4_HEIGHT), (255, 255, 255))
                     merged_image.paste(resized_invoice_image, (MARGIN, MARGIN))
-                    output_pdf_path = os.path.join(folder_path, 'invoice_page.pdf')
-                    merged_image.save(output_pdf_path, 'PDF', resolution=300.0)
-                    doc.insert_pdf(fitz.open(output_pdf_path))
-                    os.remove(output_pdf_path)
+                    self._insert_image_page(doc, merged_image)
         
                     collage_page = Image.new('RGB', (A4_WIDTH, A4_HEIGHT), (255, 255, 255))
                     collage_x_offset = (A4_WIDTH - collage_image.width) // 2
                     collage_y_offset = (A4_HEIGHT - collage_image.height) // 2
                     collage_page.paste(collage_image, (collage_x_offset, collage_y_offset))
-                    collage_pdf_path = os.path.join(folder_path, 'collage_page.pdf')
-                    collage_page.save(collage_pdf_path, 'PDF', resolution=300.0)
-                    doc.insert_pdf(fitz.open(collage_pdf_path))
-                    os.remove(collage_pdf_path)
+                    self._insert_image_page(doc, collage_page)
                 else:
                     merged_image = Image.new('RGB', (A4_WIDTH, A4_HEIGHT), (255, 255, 255))
                     merged_image.paste(resized_invoice_image, (MARGIN, MARGIN))
                     collage_y_offset = MARGIN + new_height + (remaining_space - collage_image.height) // 2
                     merged_image.paste(collage_image, (MARGIN, collage_y_offset))
-                    output_pdf_path = os.path.join(folder_path, 'combined_page.pdf')
-                    merged_image.save(output_pdf_path, 'PDF', resolution=300.0)
-                    doc.insert_pdf(fitz.open(output_pdf_path))
-                    os.remove(output_pdf_path)
+                    self._insert_image_page(doc, merged_image)
+
+            timings['collage'] = time.perf_counter() - stage_start
+            stage_start = time.perf_counter()
 
             # 处理 NEWLINE 图片
-            self._process_special_images(newline_images, folder_path, doc, 'newline_page')
+            self._process_special_images(newline_images, doc)
 
             # 处理 NEWPAGE 图片
-            self._process_special_images(newpage_images, folder_path, doc, 'newpage_image')
+            self._process_special_images(newpage_images, doc)
+            timings['special'] = time.perf_counter() - stage_start
 
+            self.stage_timings[folder_path] = timings
             self.folder_count += 1
             self.success_folders.append(folder_path)
             return 1
@@ -145,37 +168,449 @@ class PDFMerger:
             log_debug(f"处理文件夹错误 {folder_path}: {e}", self.debug_mode)
             return 0
             
-    def _process_special_images(self, image_paths, folder_path, doc, prefix):
+    def _insert_image_page(self, doc, image):
+        """将整页图片转换为PDF页面追加到文档，在内存中完成，不在子文件夹中写入临时文件"""
+        buffer = io.BytesIO()
+        image.save(buffer, 'PDF', resolution=300.0)
+        with fitz.open('pdf', buffer.getvalue()) as page_doc:
+            doc.insert_pdf(page_doc)
+
+    def _place_invoice_and_collage(self, invoice_doc, other_images, doc, timings, stage_start):
+        """
+        直接放置发票页面与原图，不经过整页栅格化
+
+        发票页面以矢量形式嵌入，拼图只根据文件头计算版面，各图片放置到计算出的区域。
+
+        Returns:
+            拼图阶段的开始时间，没有可用图片时返回None
+        """
+        if len(invoice_doc) > 1:
+            doc.insert_pdf(invoice_doc)
+            timings['invoice'] = time.perf_counter() - stage_start
+            stage_start = time.perf_counter()
+
+            layout = create_collage_layout(other_images, CONTENT_WIDTH, CONTENT_HEIGHT, self.debug_mode)
+            if layout is None:
+                log_debug("没有足够的图片，无法创建拼图.", self.debug_mode)
+            else:
+                self._place_centered_collage(doc, layout)
+            return stage_start
+
+        invoice_page = invoice_doc.load_page(0)
+        invoice_height = int(invoice_page.rect.height * CONTENT_WIDTH / invoice_page.rect.width)
+        remaining_space = CONTENT_HEIGHT - invoice_height
+        create_new_page_for_collage = invoice_height > HEIGHT_THRESHOLD
+
+        layout = create_collage_layout(
+            other_images,
+            CONTENT_WIDTH,
+            remaining_space if not create_new_page_for_collage else CONTENT_HEIGHT,
+            self.debug_mode
+        )
+        if layout is None:
+            log_debug("没有足够的图片，无法创建拼图.", self.debug_mode)
+            return None
+
+        page = new_page(doc, A4_WIDTH, A4_HEIGHT)
+        page.show_pdf_page(pixel_rect(MARGIN, MARGIN, CONTENT_WIDTH, invoice_height), invoice_doc, 0)
+        timings['invoice'] = time.perf_counter() - stage_start
+        stage_start = time.perf_counter()
+
+        if create_new_page_for_collage:
+            self._place_centered_collage(doc, layout)
+        else:
+            collage_height = layout[1]
+            collage_y_offset = MARGIN + invoice_height + (remaining_space - collage_height) // 2
+            place_collage(page, layout, MARGIN, collage_y_offset)
+        return stage_start
+
+    def _place_centered_collage(self, doc, layout):
+        """新建一页并将拼图居中放置"""
+        collage_width, collage_height, _ = layout
+        page = new_page(doc, A4_WIDTH, A4_HEIGHT)
+        place_collage(page, layout, (A4_WIDTH - collage_width) // 2, (A4_HEIGHT - collage_height) // 2)
+
+    def _process_special_images(self, image_paths, doc):
         """处理特殊图片（NEWLINE或NEWPAGE）"""
+        if self.image_placement:
+            # 每张图片单独一页，按内容区宽度居中放置原图
+            for image_path in image_paths:
+                with Image.open(image_path) as img:
+                    height = int(img.height * (CONTENT_WIDTH / img.width))
+                page = new_page(doc, A4_WIDTH, A4_HEIGHT)
+                insert_image_file(page, image_path, (MARGIN, (A4_HEIGHT - height) // 2, CONTENT_WIDTH, height))
+            return
+
+        sizes = []
         for image_path in image_paths:
-            img = Image.open(image_path)
-            scale_factor = CONTENT_WIDTH / img.width
-            resized_image = img.resize((CONTENT_WIDTH, int(img.height * scale_factor)), Image.LANCZOS)
+            # 只读取文件头获取尺寸
+            with Image.open(image_path) as img:
+                sizes.append((CONTENT_WIDTH, int(img.height * (CONTENT_WIDTH / img.width))))
 
+        # 并发解码和缩放，按原顺序逐页合成
+        for resized_image in iter_resized_images(image_paths, sizes):
             page = Image.new('RGB', (A4_WIDTH, A4_HEIGHT), (255, 255, 255))
             y_offset = (A4_HEIGHT - resized_image.height) // 2
             page.paste(resized_image, (MARGIN, y_offset))
-            pdf_path = os.path.join(folder_path, f'{prefix}.pdf')
-            page.save(pdf_path, 'PDF', resolution=300.0)
-            doc.insert_pdf(fitz.open(pdf_path))
-            os.remove(pdf_path)
+            self._insert_image_page(doc, page)
+
+    def inspect_folders(self, folder_entries, index=None, **render_options):
+        """
+        读取各子文件夹发票的文本层信息并查找重复发票，同时估算各文件夹的处理开销
+
+        文件哈希缓存在项目清单条目中，发票信息缓存在跨项目的发票索引中，未变化的发票不会重新读取。
+        需要打开PDF与图片的读取和估算与渲染使用相同的执行方式：隔离模式或传入了执行器时在工作进程中完成，
+        超时或崩溃的文件夹记为忽略，不再继续处理。
+
+        Args:
+            folder_entries: (子文件夹路径, 条目) 列表
+            index: 发票索引，为None时使用默认位置的索引
+            render_options: 传递给 render_folders 的处理参数，决定在哪里读取文件
+
+        Returns:
+            去掉读取失败的文件夹后的 (子文件夹路径, 条目) 列表
+        """
+        from invoice_index import InvoiceIndex, file_hash
+        from scheduler import inspect_folder
+        if index is None:
+            index = InvoiceIndex(debug_mode=self.debug_mode)
+
+        # 文件哈希只读取文件内容，在当前进程中计算
+        pending = []  # (子文件夹路径, 条目, 发票路径, 文件哈希, 是否需要读取发票信息)
+        for folder_path, entry in folder_entries:
+            if not entry['valid']:
+                continue
+            pdf_name = entry['pdf_files'][0]
+            pdf_path = os.path.join(folder_path, pdf_name)
+            cached = entry.get('invoice')
+
+            try:
+                # 原地覆盖同名文件不会改变目录修改时间，清单中的文件签名可能已过期，需直接检查发票文件
+                st = os.stat(pdf_path)
+                signature = [st.st_size, st.st_mtime_ns]
+                entry['files'][pdf_name] = signature
+                digest = cached['hash'] if cached and cached['signature'] == signature else file_hash(pdf_path)
+            except OSError as e:
+                log_debug(f"读取发票错误 {pdf_path}: {e}", self.debug_mode)
+                continue
+            entry['invoice'] = {'hash': digest, 'signature': signature}
+            pending.append((folder_path, entry, pdf_path, digest, digest not in index.invoices))
+
+        failed = set()
+        with self._shared_workers(render_options) as render_options:
+            executor = render_options.get('executor')
+            if executor is not None:
+                futures = [executor.submit(inspect_folder, folder_path, entry, read_invoice, self.debug_mode)
+                           if read_invoice or entry.get('cost') is None else None
+                           for folder_path, entry, _, _, read_invoice in pending]
+            else:
+                futures = [None] * len(pending)
+
+            for (folder_path, entry, pdf_path, digest, read_invoice), future in zip(pending, futures):
+                meta = None
+                if future is not None:
+                    try:
+                        entry['cost'], meta = future.result()
+                    except Exception as e:
+                        self.ignored_folders.append((folder_path, f"读取文件失败: {e}"))
+                        log_debug(f"读取文件夹错误 {folder_path}: {e}", self.debug_mode)
+                        failed.add(folder_path)
+                        continue
+                elif executor is None:
+                    # 非隔离模式下与渲染一样在当前进程中读取
+                    entry['cost'], meta = inspect_folder(folder_path, entry, read_invoice, self.debug_mode)
+
+                digest, meta = index.index_file(pdf_path, digest, meta)
+                others = index.duplicates_of(pdf_path)
+                self.invoice_records[folder_path] = (meta, others)
+                if others:
+                    log_debug(f"发现重复发票 {pdf_path}: {others}", self.debug_mode)
+
+        index.save()
+        return [(folder_path, entry) for folder_path, entry in folder_entries if folder_path not in failed]
+
+    @contextmanager
+    def _shared_workers(self, render_options):
+        """隔离模式下创建一组工作进程，供发票读取、开销估算与渲染共用，处理完成后关闭"""
+        if not render_options.get('isolate') or render_options.get('executor') is not None:
+            yield render_options
+            return
+        from isolation import IsolatedExecutor, DEFAULT_TIMEOUT
+        with IsolatedExecutor(max(render_options.get('workers', 1), 1),
+                              render_options.get('timeout') or DEFAULT_TIMEOUT,
+                              render_options.get('memory_limit')) as executor:
+            yield dict(render_options, executor=executor)
+
+    def add_summary_pages(self, doc):
+        """在文档开头插入已成功处理的文件夹的发票汇总页，返回插入的页数"""
+        from summary_page import insert_summary_pages
+        records = []
+        for folder_path in self.success_folders:
+            meta, others = self.invoice_records.get(folder_path, ({}, []))
+            records.append((os.path.basename(folder_path), meta, bool(others)))
+        page_count = insert_summary_pages(doc, records)
+
+        # 之后各部分的页码整体后移
+        self.sections = [('报销汇总', 0, page_count, None)] + [
+            (title, start + page_count, count, folder_path) for title, start, count, folder_path in self.sections]
+        return page_count
+
+    def append_folder_doc(self, doc, folder_path, folder_doc, start=None):
+        """
+        将单个子文件夹生成的文档插入总文档，并记录其页码范围
+
+        Args:
+            start: 插入位置（页码），为None时追加到末尾
+        """
+        if start is None:
+            start = len(doc)
+        doc.insert_pdf(folder_doc, start_at=start)
+        self.sections.append((os.path.basename(folder_path), start, len(folder_doc), folder_path))
+
+    def _section_records(self):
+        """生成写入输出文档的各部分页码范围记录"""
+        return [
+            {
+                'folder': os.path.basename(folder_path) if folder_path else None,
+                'start': start,
+                'count': count,
+                'fingerprint': self.fingerprints.get(folder_path),
+            }
+            for _, start, count, folder_path in self.sections
+        ]
+
+    def save_output(self, doc, output_path, linear=False):
+        """为总文档添加每个子文件夹的书签、页码标签和页码范围记录后保存"""
+        apply_navigation(doc, self.sections)
+        write_section_records(doc, self._section_records())
+        save_pdf(doc, output_path, linear, self.debug_mode, **SAVE_OPTIONS)
+
+    def update_output(self, base_folder, output_pdf, summary_page=None, compact=False,
+                      **render_options):
+        """
+        增量更新已生成的PDF文件
+
+        根据文件中记录的各子文件夹页码范围和内容指纹，只重新处理新增或发生变化的子文件夹，
+        删除已移除的子文件夹对应的页面，未变化的页面保持不动，并以增量方式追加保存到原文件。
+
+        Args:
+            base_folder: 报销项目文件夹
+            output_pdf: 要更新的PDF文件（需由本工具生成）
+            summary_page: 是否包含发票汇总页，为None时与原文件保持一致
+            compact: 是否改为完整重写文件，清除增量保存累积的无用对象
+            render_options: 传递给 render_folders 的处理参数
+
+        Returns:
+            重新处理的子文件夹数
+
+        Raises:
+            ValueError: 文件中没有页码范围记录
+        """
+        doc = fitz.open(output_pdf)
+        workers = ExitStack()
+        try:
+            render_options = workers.enter_context(self._shared_workers(render_options))
+            records = read_section_records(doc)
+            if records is None:
+                raise ValueError(f"{output_pdf} 中没有页码范围记录，无法增量更新，请重新生成")
+
+            # 检查每个文件的大小与修改时间，原地覆盖的文件也能发现
+            manifest = ProjectManifest(base_folder, self.debug_mode).scan(verify_files=True)
+            # 读取失败的文件夹记为忽略，原有页面一并删除
+            folder_entries = self.inspect_folders(manifest.folder_entries(), **render_options)
+
+            had_summary = any(record['folder'] is None for record in records)
+            if summary_page is None:
+                summary_page = had_summary
+
+            # 内容指纹未变化的子文件夹保留原有页面
+            old_records = {record['folder']: record for record in records if record['folder'] is not None}
+            kept = [entry['name'] for _, entry in folder_entries
+                    if entry['name'] in old_records and entry['valid']
+                    and entry_fingerprint(entry) == old_records[entry['name']]['fingerprint']]
+            if [record['folder'] for record in records if record['folder'] in kept] != kept:
+                # 排序规则变化导致保留页面的顺序不一致时全部重新处理
+                kept = []
+            kept = set(kept)
+
+            to_render = [(folder_path, entry) for folder_path, entry in folder_entries
+                         if entry['name'] not in kept]
+            stale = [record for record in records if record['folder'] not in kept]
+            if not to_render and not stale and summary_page == had_summary:
+                log_debug(f"{output_pdf} 已是最新", self.debug_mode)
+                return 0
+
+            # 从后往前删除，前面部分的页码不受影响
+            for record in sorted(stale, key=lambda record: record['start'], reverse=True):
+                if record['count'] > 0:
+                    doc.delete_pages(record['start'], record['start'] + record['count'] - 1)
+
+            # 设置了 progress_callback 时通过回调报告进度，否则显示命令行进度条
+            rendered = self._render_with_progress(to_render, **render_options)
+
+            # 按项目清单顺序逐个放置保留的页面与重新处理的页面
+            self.sections = []
+            cursor = 0
+            for folder_path, entry in folder_entries:
+                if entry['name'] in kept:
+                    record = old_records[entry['name']]
+                    self.sections.append((entry['name'], cursor, record['count'], folder_path))
+                    self.fingerprints[folder_path] = record['fingerprint']
+                    self.folder_count += 1
+                    self.success_folders.append(folder_path)
+                    cursor += record['count']
+                    continue
+                _, folder_doc = next(rendered)
+                if folder_doc is not None:
+                    self.append_folder_doc(doc, folder_path, folder_doc, cursor)
+                    cursor += len(folder_doc)
+                    folder_doc.close()
+            manifest.save()
+
+            if summary_page and self.folder_count > 0:
+                self.add_summary_pages(doc)
+            apply_navigation(doc, self.sections)
+            write_section_records(doc, self._section_records())
+
+            if compact or not doc.can_save_incrementally():
+                # 完整重写到临时文件后替换原文件
+                tmp_path = output_pdf + '.tmp'
+                doc.save(tmp_path, **SAVE_OPTIONS)
+                doc.close()
+                os.replace(tmp_path, output_pdf)
+            else:
+                doc.save(output_pdf, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, **TRANSFER_OPTIONS)
+            log_debug(f"已增量更新 {output_pdf}: 重新处理 {len(to_render)} 个文件夹, "
+                      f"保留 {len(kept)} 个文件夹", self.debug_mode)
+            return len(to_render)
+        finally:
+            workers.close()
+            if not doc.is_closed:
+                doc.close()
+
+    def render_folders(self, folder_entries, workers=1, memory_budget=None, isolate=False,
+                       timeout=None, memory_limit=None, executor=None):
+        """
+        依次处理各子文件夹，每个子文件夹生成一个独立的文档
+
+        Args:
+            folder_entries: (子文件夹路径, 条目) 列表
+            workers: 工作进程数，大于1时按内存预算并发处理
+            memory_budget: 并发处理时的内存预算（字节）
+            isolate: 是否在独立的工作进程中逐个处理，超时或崩溃的文件夹记为忽略，其余继续处理
+            timeout: 隔离模式下单个文件夹的处理时限（秒）
+            memory_limit: 隔离模式下每个工作进程的内存上限（字节）
+            executor: 在多次处理间复用的执行器（如常驻的 IsolatedExecutor），由调用方负责关闭
+
+        Yields:
+            (子文件夹路径, 该文件夹的文档或None)，顺序与输入一致，文档由调用方关闭
+        """
+        if workers <= 1 and not isolate and executor is None:
+            for folder_path, entry in folder_entries:
+                folder_doc = self.create_document()
+                if self.merge_invoice_and_images_to_total_pdf(folder_path, folder_doc, entry):
+                    self.fingerprints[folder_path] = entry_fingerprint(entry)
+                    yield folder_path, folder_doc
+                else:
+                    folder_doc.close()
+                    yield folder_path, None
+            return
+
+        from scheduler import MemoryBudgetScheduler
+        executor_factory = None
+        if executor is not None:
+            from contextlib import nullcontext
+            # 复用已预热的工作进程，处理完成后不关闭
+            executor_factory = lambda max_workers: nullcontext(executor)
+        elif isolate:
+            from functools import partial
+            from isolation import IsolatedExecutor, DEFAULT_TIMEOUT
+            executor_factory = partial(IsolatedExecutor, timeout=timeout or DEFAULT_TIMEOUT,
+                                       memory_limit=memory_limit)
+        scheduler = MemoryBudgetScheduler(memory_budget, max(workers, 1), self.debug_mode, executor_factory,
+                                          self.image_placement)
+        entries = dict(folder_entries)
+        for folder_path, (success, pdf_bytes, ignored_folders, timings) in scheduler.run(folder_entries):
+            # 合并工作进程中的处理结果
+            self.ignored_folders.extend(ignored_folders)
+            if timings:
+                self.stage_timings[folder_path] = timings
+            if success:
+                self.fingerprints[folder_path] = entry_fingerprint(entries[folder_path])
+                self.folder_count += 1
+                self.success_folders.append(folder_path)
+                yield folder_path, fitz.open('pdf', pdf_bytes)
+            else:
+                yield folder_path, None
+
+    def _render_with_progress(self, folder_entries, **render_options):
+        """处理各子文件夹，按工作量报告进度与预计剩余时间（界面、服务模式通过回调，命令行显示进度条）"""
+        from progress_model import ProgressModel, format_duration
+
+        self.progress_model = ProgressModel(folder_entries)
+        if self.progress_callback is not None:
+            rendered = self.render_folders(folder_entries, **render_options)
+            for i, (subfolder_path, folder_doc) in enumerate(rendered):
+                self.progress_model.complete(i, self.stage_timings.get(subfolder_path))
+                self.progress_callback(subfolder_path, i + 1, len(folder_entries))
+                yield subfolder_path, folder_doc
+            return
+
+        from tqdm import tqdm  # 仅命令行模式使用
+        bar_format = '{desc}: {percentage:3.0f}%|{bar}| {postfix}'
+        with tqdm(total=100, desc="正在处理文件夹", bar_format=bar_format) as bar:
+            rendered = self.render_folders(folder_entries, **render_options)
+            for i, (subfolder_path, folder_doc) in enumerate(rendered):
+                self.progress_model.complete(i, self.stage_timings.get(subfolder_path))
+                bar.update(self.progress_model.progress() * 100 - bar.n)
+                bar.set_postfix_str(f"预计剩余 {format_duration(self.progress_model.eta())}")
+                yield subfolder_path, folder_doc
+
+    def process_all_subfolders_to_total_pdf(self, base_folder, output_path='', max_bytes=None, max_pages=None,
+                                            summary_page=False, linear=False, manifest=None, **render_options):
+        """
+        处理所有子文件夹并合并为一个PDF文件
+
+        Args:
+            base_folder: 报销项目文件夹
+            output_path: 输出文件或目录路径
+            max_bytes: 单个输出文件的大小上限（字节），设置后按子文件夹拆分为多个文件
+            max_pages: 单个输出文件的页数上限，设置后按子文件夹拆分为多个文件
+            summary_page: 是否在开头插入发票汇总页（仅单文件输出）
+            linear: 是否保存为线性化（快速网页视图）PDF
+            manifest: 已读取的项目清单（如界面中分析文件夹时使用的清单），为None时从项目文件夹读取
+            render_options: 传递给 render_folders 的处理参数（workers、memory_budget、isolate 等）
+
+        Returns:
+            生成的PDF文件路径列表
+        """
+        if max_bytes or max_pages:
+            return self._process_all_subfolders_to_parts(base_folder, output_path, max_bytes, max_pages,
+                                                         linear, manifest, **render_options)
 
-    def process_all_subfolders_to_total_pdf(self, base_folder, output_path=''):
-        """处理所有子文件夹并合并为一个PDF文件"""
         doc = self.create_document()
 
         # 获取上级文件夹的名称
         parent_folder_name = os.path.basename(os.path.abspath(base_folder))
 
-        subfolders = [os.path.join(base_folder, subfolder) for subfolder in os.listdir(base_folder) 
-                    if os.path.isdir(os.path.join(base_folder, subfolder))]
-        # 按照Windows的排序规则（包括中文拼音）对子文件夹进行排序
-        subfolders.sort(key=windows_sort_key)
+        # 项目清单中的子文件夹已按照Windows的排序规则（包括中文拼音）排序
+        if manifest is None:
+            manifest = ProjectManifest(base_folder, self.debug_mode)
+        manifest.scan()
 
-        for subfolder_path in tqdm(subfolders, desc="正在处理文件夹"):
-            self.merge_invoice_and_images_to_total_pdf(subfolder_path, doc)
+        with self._shared_workers(render_options) as render_options:
+            folder_entries = self.inspect_folders(manifest.folder_entries(), **render_options)
+            for subfolder_path, folder_doc in self._render_with_progress(folder_entries, **render_options):
+                if folder_doc is not None:
+                    self.append_folder_doc(doc, subfolder_path, folder_doc)
+                    folder_doc.close()
+        # 保存发票哈希与估算的处理开销
+        manifest.save()
 
         if self.folder_count > 0:
+            if summary_page:
+                self.add_summary_pages(doc)
+
             timestamp = self.get_timestamp()
             # 使用上级文件夹名称作为文件名前缀
             default_output_filename = f'{parent_folder_name}_报销单_自动生成_{self.folder_count}张发票_{timestamp}.pdf'
@@ -183,14 +618,53 @@ class PDFMerger:
             output_pdf = self._determine_output_path(output_path, default_output_filename)
             if not output_pdf:
                 doc.close()
-                return
+                return []
 
-            doc.save(output_pdf)
+            self.save_output(doc, output_pdf, linear)
             doc.close()
             print(f"成功创建 {output_pdf}")
 
-            # 显示忽略的文件夹信息
+            # 显示忽略的文件夹与重复发票信息
             self._display_ignored_folders()
+            self._display_duplicate_invoices()
+            return [output_pdf]
+
+        doc.close()
+        return []
+
+    def _process_all_subfolders_to_parts(self, base_folder, output_path, max_bytes, max_pages,
+                                         linear=False, manifest=None, **render_options):
+        """处理所有子文件夹并按大小或页数上限拆分为多个PDF文件，每个分卷完成后立即写入磁盘"""
+        parent_folder_name = os.path.basename(os.path.abspath(base_folder))
+        # 分卷模式下输出路径只能是目录，指定了文件名时使用其所在目录
+        if os.path.isdir(output_path):
+            output_dir = output_path
+        else:
+            output_dir = os.path.dirname(output_path) or './'
+
+        # 所有分卷共用开始处理时的时间戳
+        writer = SplitPDFWriter(output_dir, parent_folder_name, self.get_timestamp(),
+                                max_bytes, max_pages, self.debug_mode, linear)
+
+        if manifest is None:
+            manifest = ProjectManifest(base_folder, self.debug_mode)
+        manifest.scan()
+
+        with self._shared_workers(render_options) as render_options:
+            folder_entries = self.inspect_folders(manifest.folder_entries(), **render_options)
+            for subfolder_path, folder_doc in self._render_with_progress(folder_entries, **render_options):
+                if folder_doc is not None:
+                    writer.add_folder(folder_doc, os.path.basename(subfolder_path))
+                    folder_doc.close()
+        manifest.save()
+
+        output_files = writer.close()
+        for output_pdf in output_files:
+            print(f"成功创建 {output_pdf}")
+
+        self._display_ignored_folders()
+        self._display_duplicate_invoices()
+        return output_files
 
     def _determine_output_path(self, output_path, default_filename):
         """确定输出文件路径"""
@@ -198,41 +672,48 @@ class PDFMerger:
             return os.path.join(output_path, default_filename)
         elif output_path and os.path.splitext(output_path)[1].lower() == '.pdf':
             if os.path.exists(output_path):
-                user_input = input(f"{output_path} 已存在，是否覆盖？ (y/n): ").strip().lower()
-                if user_input != 'y':
+                confirmed = self.overwrite
+                if confirmed is None:
+                    user_input = input(f"{output_path} 已存在，是否覆盖？ (y/n): ").strip().lower()
+                    confirmed = user_input == 'y'
+                if not confirmed:
                     print("操作已取消。")
                     return None
             return output_path
         else:
             return os.path.join('./', default_filename) if output_path == '' else output_path
 
-    # def _display_ignored_folders(self):
-    #     """显示被忽略的文件夹信息"""
-    #     if len(self.ignored_folders) > 0:
-    #         print("\n以下文件夹被忽略：")
-    #         table = PrettyTable()
-    #         table.field_names = ["路径", "PDF", "图片"]
-            
-    #         for folder_data in self.ignored_folders:
-    #             if len(folder_data) == 4:  # 包含PDF和图片计数的情况
-    #                 folder_path, pdf_count, img_count, reason = folder_data
-    #                 # PDF状态：需要恰好1个PDF
-    #                 pdf_status = f"{Fore.GREEN}√{Style.RESET_ALL}" if pdf_count == 1 else f"{Fore.RED}X({pdf_count}){Style.RESET_ALL}"
-                    
-    #                 # 图片状态：需要至少2张图片
-    #                 img_status = f"{Fore.GREEN}√{Style.RESET_ALL}" if img_count >= 2 else f"{Fore.RED}X({img_count}){Style.RESET_ALL}"
-                    
-    #                 table.add_row([folder_path, pdf_status, img_status])
-    #             else:
-    #                 # 处理异常情况
-    #                 folder_path, error = folder_data
-    #                 table.add_row([folder_path, f"{Fore.RED}错误{Style.RESET_ALL}", error])
-            
-    #         print(table)
-    #         print(f"\n需求：每个文件夹应有1个PDF文件和至少2张图片文件")
+    def _display_ignored_folders(self):
+        """显示被忽略的文件夹信息"""
+        if len(self.ignored_folders) > 0:
+            print("\n以下文件夹被忽略：")
+            for folder_data in self.ignored_folders:
+                if len(folder_data) == 4:  # 包含PDF和图片计数的情况
+                    folder_path, pdf_count, img_count, reason = folder_data
+                    print(f"{folder_path}: {reason}")
+                else:
+                    # 处理异常情况
+                    folder_path, error = folder_data
+                    print(f"{folder_path}: 错误 {error}")
+
+            print(f"\n需求：每个文件夹应有1个PDF文件和至少2张图片文件")
+
+    def _display_duplicate_invoices(self):
+        """显示重复的发票"""
+        from invoice_index import describe_invoice
+        duplicates = [(folder_path, meta, others)
+                      for folder_path, (meta, others) in self.invoice_records.items() if others]
+        if duplicates:
+            print("\n以下发票与其他文件重复：")
+            for folder_path, meta, others in duplicates:
+                print(f"{folder_path} ({describe_invoice(meta)}):")
+                for other_path in others:
+                    print(f"    {other_path}")
 
     def rename_pdf_files(self, base_folder):
         """根据上级文件夹名称重命名PDF文件"""
+        from tqdm import tqdm  # 仅命令行模式使用
+
         subfolders = [os.path.join(base_folder, subfolder) for subfolder in os.listdir(base_folder) 
                     if os.path.isdir(os.path.join(base_folder, subfolder))]
 
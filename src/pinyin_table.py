@@ -0,0 +1,41 @@
+from bisect import bisect_right
+from functools import lru_cache
+
+# GB2312 一级汉字（3755个常用字）按拼音顺序编码，
+# 因此只需记录每个首字母第一个汉字的编码即可查出首字母，无需加载完整拼音词典
+GB2312_LEVEL1_START = 0xB0A1
+GB2312_LEVEL1_END = 0xD7F9
+FIRST_LETTER_TABLE = (
+    (0xB0A1, 'a'), (0xB0C5, 'b'), (0xB2C1, 'c'), (0xB4EE, 'd'), (0xB6EA, 'e'),
+    (0xB7A2, 'f'), (0xB8C1, 'g'), (0xB9FE, 'h'), (0xBBF7, 'j'), (0xBFA6, 'k'),
+    (0xC0AC, 'l'), (0xC2E8, 'm'), (0xC4C3, 'n'), (0xC5B6, 'o'), (0xC5BE, 'p'),
+    (0xC6DA, 'q'), (0xC8BB, 'r'), (0xC8F6, 's'), (0xCBFA, 't'), (0xCDDA, 'w'),
+    (0xCEF4, 'x'), (0xD1B9, 'y'), (0xD4D1, 'z'),
+)
+_TABLE_CODES = [code for code, _ in FIRST_LETTER_TABLE]
+
+@lru_cache(maxsize=4096)
+def first_letter(char):
+    """
+    获取单个汉字的拼音首字母（小写）
+
+    常用字通过GB2312编码区间直接查表；其他汉字在安装了pypinyin时使用pypinyin，
+    否则返回字符本身。
+    """
+    try:
+        encoded = char.encode('gb2312')
+    except UnicodeEncodeError:
+        encoded = b''
+
+    if len(encoded) == 2:
+        code = (encoded[0] << 8) | encoded[1]
+        if GB2312_LEVEL1_START <= code <= GB2312_LEVEL1_END:
+            return FIRST_LETTER_TABLE[bisect_right(_TABLE_CODES, code) - 1][1]
+
+    # 生僻字才加载pypinyin
+    try:
+        from pypinyin import pinyin, Style as PinyinStyle
+    except ImportError:
+        return char
+    py = pinyin(char, style=PinyinStyle.FIRST_LETTER)
+    return py[0][0].lower() if py else char
@@ -0,0 +1,142 @@
+import time
+from scheduler import estimate_folder_cost
+
+# 处理阶段：发票渲染（按页）、拼图（按百万像素）、NEWLINE/NEWPAGE 图片（按百万像素）
+STAGES = ('invoice', 'collage', 'special')
+# 各阶段的初始速率（秒/单位），处理过程中根据实测耗时修正
+DEFAULT_RATES = {'invoice': 0.3, 'collage': 0.02, 'special': 0.03}
+# 初始速率的权重，相当于已观测到的单位数；实测数据越多，初始值的影响越小
+PRIOR_UNITS = {'invoice': 3, 'collage': 20, 'special': 20}
+# 每个有效文件夹的固定开销（秒）
+FOLDER_OVERHEAD = 0.05
+
+def format_duration(seconds):
+    """将秒数格式化为“X分Y秒”"""
+    if seconds is None:
+        return '计算中'
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f'{minutes}分{seconds}秒' if minutes else f'{seconds}秒'
+
+def _cost_units(cost):
+    """将估算开销转换为各阶段的工作量"""
+    return {
+        'invoice': cost['invoice_pages'],
+        'collage': cost['collage_pixels'] / 1e6,
+        'special': sum(cost['special_pixels']) / 1e6,
+    }
+
+class ProgressModel:
+    """
+    按工作量加权的进度与剩余时间估算
+
+    每个文件夹的工作量由扫描阶段的估算开销（发票页数、图片像素数）乘以各阶段速率得到，
+    速率随实测的各阶段耗时不断修正。剩余时间按实际经过时间与已完成工作量的比例推算，
+    因此并发处理时同样适用。
+
+    总工作量与已完成工作量按阶段累计单位数，速率变化时无需逐个文件夹重新计算，
+    每次更新与查询的开销与文件夹数量无关。
+    """
+
+    def __init__(self, folder_entries):
+        self.folder_paths = [folder_path for folder_path, _ in folder_entries]
+        self.valid = [entry['valid'] for _, entry in folder_entries]
+        self.units = [_cost_units(estimate_folder_cost(folder_path, entry)) for folder_path, entry in folder_entries]
+        self.done = [False] * len(self.units)
+        self.timings = [None] * len(self.units)
+        self.observed_time = dict.fromkeys(STAGES, 0.0)
+        self.observed_units = dict.fromkeys(STAGES, 0.0)
+        # 有效文件夹的各阶段单位数合计（总计与已完成），以及有效文件夹数
+        self.total_units = dict.fromkeys(STAGES, 0.0)
+        self.done_units = dict.fromkeys(STAGES, 0.0)
+        self.total_folders = 0
+        self.done_folders = 0
+        for valid, units in zip(self.valid, self.units):
+            if valid:
+                self.total_folders += 1
+                for stage in STAGES:
+                    self.total_units[stage] += units[stage]
+        self.remaining = len(self.units)
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    def rate(self, stage):
+        """当前估计的阶段速率（秒/单位）"""
+        return ((self.observed_time[stage] + PRIOR_UNITS[stage] * DEFAULT_RATES[stage])
+                / (self.observed_units[stage] + PRIOR_UNITS[stage]))
+
+    def predicted_seconds(self, index):
+        """按当前速率估计单个文件夹的处理耗时"""
+        if not self.valid[index]:
+            return 0.0
+        units = self.units[index]
+        return FOLDER_OVERHEAD + sum(units[stage] * self.rate(stage) for stage in STAGES)
+
+    def complete(self, index, timings=None):
+        """
+        记录一个文件夹处理完成
+
+        Args:
+            index: 文件夹序号
+            timings: 各阶段实测耗时 {阶段: 秒}
+        """
+        if not self.done[index]:
+            self.done[index] = True
+            self.remaining -= 1
+            if self.valid[index]:
+                self.done_folders += 1
+                for stage in STAGES:
+                    self.done_units[stage] += self.units[index][stage]
+        self.timings[index] = timings
+        for stage, seconds in (timings or {}).items():
+            if stage in self.observed_time and self.units[index][stage] > 0:
+                self.observed_time[stage] += seconds
+                self.observed_units[stage] += self.units[index][stage]
+        if self.remaining == 0:
+            self.end_time = time.perf_counter()
+
+    def _work(self):
+        """按当前速率计算 (已完成工作量, 总工作量)"""
+        rates = {stage: self.rate(stage) for stage in STAGES}
+        done_work = FOLDER_OVERHEAD * self.done_folders + sum(
+            self.done_units[stage] * rates[stage] for stage in STAGES)
+        total_work = FOLDER_OVERHEAD * self.total_folders + sum(
+            self.total_units[stage] * rates[stage] for stage in STAGES)
+        return done_work, total_work
+
+    def progress(self):
+        """加权进度（0~1）"""
+        done_work, total_work = self._work()
+        if total_work <= 0:
+            return 1.0 if self.remaining == 0 else 0.0
+        return done_work / total_work
+
+    def elapsed(self):
+        """已经过的时间（秒）"""
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def eta(self):
+        """预计剩余时间（秒），尚无已完成的工作时返回None"""
+        done_work, total_work = self._work()
+        if done_work <= 0:
+            return None
+        return self.elapsed() * (total_work - done_work) / done_work
+
+    def summary(self):
+        """导出估算与实测结果，便于规划批处理时间"""
+        done_work, total_work = self._work()
+        return {
+            'elapsed_seconds': round(self.elapsed(), 3),
+            'predicted_total_seconds': round(total_work, 3),
+            'rates': {stage: self.rate(stage) for stage in STAGES},
+            'folders': [
+                {
+                    'path': folder_path,
+                    'valid': valid,
+                    'units': units,
+                    'predicted_seconds': round(self.predicted_seconds(i), 3),
+                    'timings': timings,
+                }
+                for i, (folder_path, valid, units, timings)
+                in enumerate(zip(self.folder_paths, self.valid, self.units, self.timings))
+            ],
+        }
@@ -0,0 +1,107 @@
+import sys
+import time
+import fitz  # PyMuPDF
+from PIL import Image
+
+def _pixmap_mode(pix):
+    """根据Pixmap的通道数和透明通道确定对应的PIL模式，不支持时返回None"""
+    colorants = pix.n - pix.alpha
+    if colorants == 1:
+        return 'LA' if pix.alpha else 'L'
+    if colorants == 3:
+        return 'RGBA' if pix.alpha else 'RGB'
+    if colorants == 4 and not pix.alpha:
+        return 'CMYK'
+    return None
+
+def pixmap_to_image(pix):
+    """
+    将PyMuPDF的Pixmap包装为PIL图像
+
+    L、RGBA、CMYK 模式直接引用Pixmap的像素内存，不发生复制；
+    RGB 在Pillow内部以4字节存储，只在解包时复制一次（原方式先复制为bytes再解包，共两次）。
+    带透明通道的CMYK等Pillow不支持的格式会先由MuPDF转换为RGB。
+
+    Args:
+        pix: fitz.Pixmap 对象
+
+    Returns:
+        PIL图像对象，图像持有对Pixmap的引用，保证像素内存在图像使用期间有效
+    """
+    mode = _pixmap_mode(pix)
+    if mode is None:
+        if pix.colorspace is None:
+            raise ValueError(f"不支持无颜色空间的Pixmap (n={pix.n}, alpha={pix.alpha})")
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+        mode = _pixmap_mode(pix)
+
+    # 旧版PyMuPDF没有 samples_mv，此时退回到复制一次的 samples
+    samples = getattr(pix, 'samples_mv', None)
+    if samples is None:
+        samples = pix.samples
+
+    image = Image.frombuffer(mode, (pix.width, pix.height), samples, 'raw', mode, pix.stride, 1)
+    image._pixmap = pix
+    return image
+
+def render_page_to_width(page, target_width, alpha=False):
+    """
+    直接按目标像素宽度渲染PDF页面，避免先高倍渲染再缩小
+
+    Args:
+        page: fitz.Page 对象
+        target_width: 目标宽度（像素）
+        alpha: 是否保留透明背景
+
+    Returns:
+        宽度为 target_width 的PIL图像对象
+    """
+    scale = target_width / page.rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=alpha)
+    image = pixmap_to_image(pix)
+
+    # MuPDF按像素边界取整，宽度可能相差1像素
+    if image.width != target_width:
+        new_height = int(image.height * target_width / image.width)
+        image = image.resize((target_width, new_height), Image.LANCZOS)
+    return image
+
+def _render_legacy(page, target_width):
+    """原有方式：5倍渲染、复制为RGB图像后缩小"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(5, 5))
+    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    new_height = int(image.height * target_width / image.width)
+    return image.resize((target_width, new_height), Image.LANCZOS)
+
+def benchmark(pdf_path, target_width=2244, rounds=10):
+    """
+    对比原有渲染方式与直接按目标宽度渲染的耗时
+
+    Args:
+        pdf_path: 用于测试的发票PDF
+        target_width: 目标宽度（像素），默认为A4内容区宽度
+        rounds: 重复次数
+
+    Returns:
+        {方式名称: 平均耗时（秒）}
+    """
+    doc = fitz.open(pdf_path)
+    page = doc.load_page(0)
+    results = {}
+    for name, render in (('legacy', _render_legacy), ('bridge', render_page_to_width)):
+        # 预热一次，排除字体加载等首次开销
+        render(page, target_width)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            render(page, target_width)
+        results[name] = (time.perf_counter() - start) / rounds
+        print(f"{name}: {results[name] * 1000:.1f} ms/页")
+    doc.close()
+    print(f"加速比: {results['legacy'] / results['bridge']:.2f}x")
+    return results
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("用法: python raster_bridge.py 发票.pdf [重复次数]")
+        sys.exit(1)
+    benchmark(sys.argv[1], rounds=int(sys.argv[2]) if len(sys.argv) > 2 else 10)
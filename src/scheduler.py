@@ -0,0 +1,185 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import fitz  # PyMuPDF
+from PIL import Image
+from file_utils import log_debug
+from navigation import TRANSFER_OPTIONS
+from collage_creator import DECODE_THREADS
+
+# Pillow解码后的RGB/RGBA图像每像素占4字节
+BYTES_PER_PIXEL = 4
+# 300 DPI 的A4页面画布（每个页面合成时同时存在页面画布与发票渲染结果）
+PAGE_CANVAS_BYTES = 2480 * 3508 * BYTES_PER_PIXEL
+# 每个工作进程的解释器与库的基础内存
+WORKER_BASE_MEMORY = 96 * 1024 * 1024
+# 默认内存预算
+DEFAULT_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024
+# 渲染一页发票的CPU开销，折算为解码的像素数
+PAGE_PIXEL_EQUIVALENT = 4 * 1000 * 1000
+
+def _image_pixels(image_path):
+    """只读取图片文件头获取像素数，不解码图像"""
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+        return width * height
+    except Exception:
+        return 0
+
+def _pdf_page_count(pdf_path):
+    """获取PDF页数"""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+def estimate_folder_cost(folder_path, entry):
+    """
+    根据文件头估算处理单个子文件夹的峰值内存与CPU开销
+
+    结果缓存在项目清单条目的 cost 字段中，文件夹变化后条目会被重建。
+
+    Args:
+        folder_path: 子文件夹路径
+        entry: 项目清单条目
+
+    Returns:
+        {'memory': 峰值内存（字节）, 'cpu': CPU开销（像素当量）, 'invoice_pages', 'collage_pixels', 'special_pixels'}
+    """
+    cost = entry.get('cost')
+    if cost is not None:
+        return cost
+
+    if not entry['valid']:
+        cost = {'memory': 0, 'cpu': 0, 'invoice_pages': 0, 'collage_pixels': 0, 'special_pixels': []}
+        entry['cost'] = cost
+        return cost
+
+    collage_pixels = sum(_image_pixels(os.path.join(folder_path, f)) for f in entry['other_images'])
+    special_pixels = [_image_pixels(os.path.join(folder_path, f))
+                      for f in entry['newline_images'] + entry['newpage_images']]
+    invoice_pages = _pdf_page_count(os.path.join(folder_path, entry['pdf_files'][0]))
+
+    # 拼图阶段：所有图片同时解码，加上页面画布与发票渲染结果
+    collage_memory = collage_pixels * BYTES_PER_PIXEL + 2 * PAGE_CANVAS_BYTES
+    # 特殊图片阶段：最多 DECODE_THREADS 张同时解码，缩放后的图片（不超过一页大小）
+    # 最多有 DECODE_THREADS 张等待合成，另加正在合成的页面画布
+    concurrent_pixels = sum(sorted(special_pixels)[-DECODE_THREADS:])
+    special_memory = concurrent_pixels * BYTES_PER_PIXEL + (DECODE_THREADS + 1) * PAGE_CANVAS_BYTES
+
+    cost = {
+        'memory': WORKER_BASE_MEMORY + max(collage_memory, special_memory),
+        'cpu': collage_pixels + sum(special_pixels) + invoice_pages * PAGE_PIXEL_EQUIVALENT,
+        'invoice_pages': invoice_pages,
+        'collage_pixels': collage_pixels,
+        'special_pixels': special_pixels,
+    }
+    entry['cost'] = cost
+    return cost
+
+def inspect_folder(folder_path, entry, read_invoice=True, debug_mode=False):
+    """
+    在工作进程中读取单个子文件夹的发票信息并估算处理开销
+
+    Args:
+        read_invoice: 是否读取发票信息（发票索引中已有该文件时不需要）
+
+    Returns:
+        (处理开销, 发票信息或None)
+    """
+    from invoice_index import read_invoice_metadata
+    cost = estimate_folder_cost(folder_path, entry)
+    meta = None
+    if read_invoice:
+        meta = read_invoice_metadata(os.path.join(folder_path, entry['pdf_files'][0]), debug_mode)
+    return cost, meta
+
+def render_folder(folder_path, entry, debug_mode=False, image_placement=False):
+    """
+    在工作进程中处理单个子文件夹
+
+    Returns:
+        (是否成功, 生成的PDF字节或None, 忽略的文件夹记录列表, 各阶段耗时)
+    """
+    from pdf_merger import PDFMerger
+    merger = PDFMerger(debug_mode=debug_mode, image_placement=image_placement)
+    doc = merger.create_document()
+    try:
+        success = merger.merge_invoice_and_images_to_total_pdf(folder_path, doc, entry)
+        return (bool(success), doc.tobytes(**TRANSFER_OPTIONS) if success else None, merger.ignored_folders,
+                merger.stage_timings.get(folder_path, {}))
+    finally:
+        doc.close()
+
+class MemoryBudgetScheduler:
+    """
+    按内存预算并发处理子文件夹
+
+    按顺序提交任务，只要正在处理的任务与已完成但尚未输出的结果的内存总和不超过预算就继续提交；
+    单个任务超出预算时等其他任务全部完成后单独处理。结果严格按照提交顺序输出。
+    """
+
+    def __init__(self, memory_budget=None, max_workers=None, debug_mode=False, executor_factory=None,
+                 image_placement=False):
+        self.memory_budget = memory_budget or DEFAULT_MEMORY_BUDGET
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.debug_mode = debug_mode
+        # 默认使用进程池；也可传入隔离执行器等接口兼容的执行器
+        self.executor_factory = executor_factory or ProcessPoolExecutor
+        self.image_placement = image_placement  # 传递给工作进程中的 PDFMerger
+
+    def run(self, folder_entries):
+        """
+        处理所有子文件夹
+
+        Args:
+            folder_entries: (子文件夹路径, 条目) 列表
+
+        Yields:
+            (子文件夹路径, (是否成功, PDF字节或None, 忽略的文件夹记录列表, 各阶段耗时))，顺序与输入一致
+        """
+        costs = [estimate_folder_cost(path, entry)['memory'] for path, entry in folder_entries]
+        total = len(folder_entries)
+        next_submit = 0
+        next_emit = 0
+        running = {}  # future -> 序号
+        results = {}  # 序号 -> 结果（已完成但尚未按顺序输出）
+        in_use = 0  # 正在处理的估算内存 + 等待输出的结果大小
+
+        with self.executor_factory(max_workers=self.max_workers) as pool:
+            while next_emit < total:
+                # 在预算范围内按顺序提交任务，没有任务在处理时至少提交一个
+                while next_submit < total and len(running) < self.max_workers:
+                    memory = costs[next_submit]
+                    if (running or results) and in_use + memory > self.memory_budget:
+                        break
+                    folder_path, entry = folder_entries[next_submit]
+                    future = pool.submit(render_folder, folder_path, entry, self.debug_mode,
+                                         self.image_placement)
+                    running[future] = next_submit
+                    in_use += memory
+                    next_submit += 1
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = running.pop(future)
+                        in_use -= costs[index]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            folder_path = folder_entries[index][0]
+                            log_debug(f"处理文件夹错误 {folder_path}: {e}", self.debug_mode)
+                            result = (False, None, [(folder_path, str(e))], {})
+                        if result[1]:
+                            in_use += len(result[1])
+                        results[index] = result
+
+                # 按顺序输出已完成的结果
+                while next_emit in results:
+                    result = results.pop(next_emit)
+                    if result[1]:
+                        in_use -= len(result[1])
+                    yield folder_entries[next_emit][0], result
+                    next_emit += 1
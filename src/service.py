@@ -0,0 +1,355 @@
+import os
+import sys
+import json
+import uuid
+import hmac
+import queue
+import secrets
+import argparse
+import threading
+import urllib.request
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 服务只监听本机地址
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 服务地址与本次会话的访问令牌，只有当前用户可读；客户端从这里读取
+SERVICE_INFO_PATH = os.path.join(os.path.expanduser('~'), '.invassist', 'service.json')
+# 保留最近的任务记录数
+MAX_FINISHED_JOBS = 100
+FINAL_STATUSES = ('done', 'failed')
+
+class Job:
+    """
+    一次处理任务
+
+    任务的进度以事件列表记录，客户端可以随时从头读取，任务结束前会阻塞等待新事件。
+    """
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = 'queued'
+        self.events = []
+        self.output_files = []
+        self._cond = threading.Condition()
+        self.emit('queued')
+
+    def emit(self, event, **data):
+        """记录一个事件并唤醒等待中的客户端"""
+        with self._cond:
+            if event in FINAL_STATUSES or event == 'running':
+                self.status = event
+            self.events.append(dict(data, event=event, job=self.id))
+            self._cond.notify_all()
+
+    def iter_events(self):
+        """依次返回所有事件，直到任务结束"""
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.events) and self.status not in FINAL_STATUSES:
+                    self._cond.wait()
+                events = self.events[index:]
+                index = len(self.events)
+                finished = self.status in FINAL_STATUSES
+            yield from events
+            if finished and index == len(self.events):
+                return
+
+    def to_dict(self):
+        return {'job': self.id, 'status': self.status, 'params': self.params,
+                'output_files': self.output_files}
+
+class RenderService:
+    """
+    常驻的本地处理服务
+
+    服务进程只导入一次处理模块，并保持一组已预热的隔离工作进程，任务按提交顺序依次处理，
+    省去每次运行的解释器启动、库导入和首次渲染的开销。
+    """
+
+    def __init__(self, workers=None, memory_budget=None, timeout=None, memory_limit=None, debug_mode=False):
+        from isolation import IsolatedExecutor, DEFAULT_TIMEOUT
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.memory_budget = memory_budget
+        self.debug_mode = debug_mode
+        self.executor = IsolatedExecutor(self.workers, timeout or DEFAULT_TIMEOUT, memory_limit)
+        self.jobs = OrderedDict()  # 任务ID -> 任务
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._runner = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """预先导入处理模块并启动全部工作进程，然后开始接收任务"""
+        import pdf_merger  # noqa: F401
+        warmup = [self.executor.submit(os.getpid) for _ in range(self.workers)]
+        for future in warmup:
+            future.result()
+        self._runner.start()
+
+    def submit(self, params):
+        """
+        提交任务
+
+        Args:
+            params: 任务参数，base_folder 为必填项，其余与命令行参数对应
+
+        Returns:
+            新建的任务
+
+        Raises:
+            ValueError: 参数无效
+        """
+        base_folder = params.get('base_folder')
+        if not base_folder or not os.path.isdir(base_folder):
+            raise ValueError(f"报销项目文件夹不存在: {base_folder}")
+        if params.get('linear'):
+            from navigation import linearization_available, LINEARIZATION_UNAVAILABLE
+            if not linearization_available():
+                raise ValueError(LINEARIZATION_UNAVAILABLE)
+        if params.get('summary') and (params.get('max_bytes') or params.get('max_pages')):
+            raise ValueError("拆分输出（max_bytes/max_pages）不支持发票汇总页（summary）")
+        update = params.get('update')
+        if update and not os.path.isfile(update):
+            raise ValueError(f"要更新的文件不存在: {update}")
+        output = params.get('output') or ''
+        if (not update and not params.get('overwrite') and os.path.splitext(output)[1].lower() == '.pdf'
+                and os.path.exists(output)):
+            # 服务无法像命令行那样询问是否覆盖
+            raise ValueError(f"输出文件已存在: {output}，如需覆盖请设置 overwrite")
+
+        job = Job(params)
+        with self._lock:
+            self.jobs[job.id] = job
+            # 只保留最近的已结束任务
+            finished = [job_id for job_id, old_job in self.jobs.items() if old_job.status in FINAL_STATUSES]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[job_id]
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            job.emit('running')
+            try:
+                job.output_files = self._process(job)
+            except Exception as e:
+                job.emit('failed', error=str(e))
+                continue
+            if job.output_files:
+                job.emit('done', output_files=job.output_files)
+            else:
+                job.emit('failed', error='没有成功处理任何文件夹')
+
+    def _process(self, job):
+        """在服务进程中执行任务，各子文件夹交给预热的工作进程处理"""
+        from pdf_merger import PDFMerger
+        params = job.params
+        merger = PDFMerger(debug_mode=self.debug_mode, image_placement=bool(params.get('place_images')))
+        merger.overwrite = bool(params.get('overwrite'))
+
+        def report(folder_path, done, total):
+            model = merger.progress_model
+            job.emit('progress', folder=os.path.basename(folder_path), done=done, total=total,
+                     progress=round(model.progress(), 4), eta=model.eta())
+
+        merger.progress_callback = report
+        render_options = dict(workers=self.workers, memory_budget=self.memory_budget, executor=self.executor)
+        if params.get('update'):
+            merger.update_output(params['base_folder'], params['update'], summary_page=params.get('summary'),
+                                 compact=bool(params.get('compact')), **render_options)
+            output_files = [params['update']]
+        else:
+            output_files = merger.process_all_subfolders_to_total_pdf(
+                params['base_folder'], params.get('output', ''),
+                max_bytes=params.get('max_bytes'), max_pages=params.get('max_pages'),
+                summary_page=bool(params.get('summary')), linear=bool(params.get('linear')),
+                **render_options)
+
+        job.emit('report', ignored=[list(folder_data) for folder_data in merger.ignored_folders],
+                 duplicates=[[folder_path, others] for folder_path, (_, others)
+                             in merger.invoice_records.items() if others])
+        return output_files
+
+    def close(self):
+        """停止接收任务并关闭工作进程"""
+        self._queue.put(None)
+        if self._runner.is_alive():
+            self._runner.join()
+        self.executor.shutdown()
+
+def write_service_info(url, token, path=SERVICE_INFO_PATH):
+    """保存服务地址与访问令牌，文件权限仅限当前用户（Windows 下依赖用户目录本身的权限）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'token': token}, f)
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, path)
+
+def load_service_info(path=SERVICE_INFO_PATH):
+    """
+    读取正在运行的服务的地址与访问令牌
+
+    Returns:
+        (服务地址, 访问令牌)
+
+    Raises:
+        OSError: 服务未启动（信息文件不存在）
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"服务未启动（找不到 {path}），请先运行 assistant.py serve") from None
+    return info['url'], info['token']
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP接口：
+
+        POST /jobs               提交任务，返回 {"job": 任务ID}
+        GET  /jobs/<ID>          查询任务状态与输出文件
+        GET  /jobs/<ID>/events   以每行一个JSON的形式推送进度事件，任务结束后关闭连接
+
+    所有请求都必须带有 Authorization: Bearer <令牌>，且 Host 为本机地址，
+    防止浏览器中的网页通过跨站请求或DNS重绑定提交任务、覆盖文件。
+    """
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        """检查 Host 与访问令牌，不通过时返回错误响应"""
+        port = self.server.server_address[1]
+        host = (self.headers.get('Host') or '').lower()
+        if host not in (f'127.0.0.1:{port}', f'localhost:{port}'):
+            self._send_json(403, {'error': '只接受本机地址的请求'})
+            return False
+        expected = f'Bearer {self.server.token}'
+        if not hmac.compare_digest(self.headers.get('Authorization', '').encode('utf-8'), expected.encode('utf-8')):
+            self._send_json(401, {'error': '访问令牌无效'})
+            return False
+        return True
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': '未知的地址'})
+            return
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._send_json(415, {'error': '请求内容必须为 application/json'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            params = json.loads(self.rfile.read(length).decode('utf-8'))
+            job = self.server.service.submit(params)
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(202, {'job': job.id})
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts = self.path.strip('/').split('/')
+        job = self.server.service.get(parts[1]) if len(parts) >= 2 and parts[0] == 'jobs' else None
+        if job is None:
+            self._send_json(404, {'error': '任务不存在'})
+            return
+        if len(parts) == 2:
+            self._send_json(200, job.to_dict())
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.end_headers()
+        for event in job.iter_events():
+            self.wfile.write(json.dumps(event, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        if self.server.service.debug_mode:
+            super().log_message(format, *args)
+
+def serve(port=DEFAULT_PORT, info_path=SERVICE_INFO_PATH, **service_options):
+    """启动服务并一直运行，直到按下 Ctrl+C"""
+    service = RenderService(**service_options)
+    service.start()
+    server = ThreadingHTTPServer((DEFAULT_HOST, port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    # 每次启动生成新的访问令牌
+    server.token = secrets.token_urlsafe(32)
+    url = f'http://{DEFAULT_HOST}:{server.server_address[1]}'
+    write_service_info(url, server.token, info_path)
+    print(f"服务已启动: {url}（{service.workers} 个工作进程）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        try:
+            os.remove(info_path)
+        except OSError:
+            pass
+
+def _request(path, data=None):
+    url, token = load_service_info()
+    headers = {'Authorization': f'Bearer {token}'}
+    if data is not None:
+        headers['Content-Type'] = 'application/json'
+        data = json.dumps(data).encode('utf-8')
+    return urllib.request.urlopen(urllib.request.Request(f'{url}{path}', data=data, headers=headers))
+
+def submit_job(params):
+    """向正在运行的服务提交任务，返回任务ID"""
+    with _request('/jobs', params) as response:
+        return json.loads(response.read().decode('utf-8'))['job']
+
+def stream_events(job_id):
+    """依次返回任务的进度事件，直到任务结束"""
+    with _request(f'/jobs/{job_id}/events') as response:
+        for line in response:
+            if line.strip():
+                yield json.loads(line.decode('utf-8'))
+
+def main(argv=None):
+    """服务模式入口函数"""
+    parser = argparse.ArgumentParser(description='发票处理助手（本地服务模式）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口（只监听本机地址）')
+    parser.add_argument('--workers', type=int, default=None, help='常驻的工作进程数，默认最多4个')
+    parser.add_argument('--memory-budget', type=float, default=None, help='并发处理时的内存预算（MB）')
+    parser.add_argument('--timeout', type=float, default=None, help='单个文件夹的处理时限（秒），默认120')
+    parser.add_argument('--memory-limit', type=float, default=None, help='每个工作进程的内存上限（MB）')
+    parser.add_argument('--debug', action='store_true', help='输出调试日志')
+    args = parser.parse_args(argv)
+
+    serve(args.port, workers=args.workers,
+          memory_budget=int(args.memory_budget * 1024 * 1024) if args.memory_budget else None,
+          timeout=args.timeout,
+          memory_limit=int(args.memory_limit * 1024 * 1024) if args.memory_limit else None,
+          debug_mode=args.debug)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import os
+import fitz  # PyMuPDF
+from file_utils import log_debug
+# 分卷保存与估算大小时使用相同的参数，保证估算值与实际文件大小一致
+from navigation import apply_navigation, save_pdf, SAVE_OPTIONS
+
+class SplitPDFWriter:
+    """
+    按文件大小或页数上限将输出拆分为多个PDF文件
+
+    始终在子文件夹边界处切分，每个分卷写满后立即保存到磁盘并释放内存。
+    单个子文件夹超过上限时会单独成为一个分卷。
+    """
+
+    def __init__(self, output_dir, prefix, timestamp, max_bytes=None, max_pages=None, debug_mode=False,
+                 linear=False):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.timestamp = timestamp
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.debug_mode = debug_mode
+        self.linear = linear
+        self.output_files = []
+        self._reset()
+
+    def _reset(self):
+        self.doc = fitz.open()
+        self.part_bytes = 0
+        self.part_folders = 0
+        self.sections = []  # 当前分卷中各子文件夹的 (标题, 起始页, 页数)
+
+    def _exceeds(self, extra_bytes, extra_pages):
+        """判断加入新内容后当前分卷是否超出上限"""
+        if self.max_bytes and self.part_bytes + extra_bytes > self.max_bytes:
+            return True
+        if self.max_pages and len(self.doc) + extra_pages > self.max_pages:
+            return True
+        return False
+
+    def add_folder(self, folder_doc, title=None):
+        """
+        添加一个子文件夹生成的页面
+
+        Args:
+            folder_doc: 仅包含该子文件夹页面的文档
+            title: 该子文件夹在书签中的标题
+        """
+        folder_pages = len(folder_doc)
+        folder_bytes = len(folder_doc.tobytes(**SAVE_OPTIONS)) if self.max_bytes else 0
+
+        if self.part_folders > 0 and self._exceeds(folder_bytes, folder_pages):
+            self.flush()
+
+        if self._exceeds(folder_bytes, folder_pages):
+            log_debug(f"单个文件夹超出分卷上限（{folder_pages}页, {folder_bytes}字节），将单独成卷", self.debug_mode)
+
+        if title:
+            self.sections.append((title, len(self.doc), folder_pages))
+        self.doc.insert_pdf(folder_doc)
+        self.part_bytes += folder_bytes
+        self.part_folders += 1
+
+    def part_path(self, index, folder_count):
+        """生成分卷文件路径，沿用带时间戳的命名规则并追加分卷序号"""
+        filename = f'{self.prefix}_报销单_自动生成_{folder_count}张发票_{self.timestamp}_part{index:02d}.pdf'
+        return os.path.join(self.output_dir, filename)
+
+    def flush(self):
+        """将当前分卷写入磁盘并开始新的分卷"""
+        if self.part_folders == 0:
+            return None
+
+        output_pdf = self.part_path(len(self.output_files) + 1, self.part_folders)
+        apply_navigation(self.doc, self.sections)
+        save_pdf(self.doc, output_pdf, self.linear, self.debug_mode, **SAVE_OPTIONS)
+        self.doc.close()
+        self.output_files.append(output_pdf)
+        log_debug(f"已写入分卷 {output_pdf} ({os.path.getsize(output_pdf)} 字节)", self.debug_mode)
+
+        self._reset()
+        return output_pdf
+
+    def close(self):
+        """写入最后一个分卷并返回所有分卷路径"""
+        self.flush()
+        self.doc.close()
+        return self.output_files
@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+# 从启动进程到首个窗口显示的目标耗时（秒）
+TARGET_SECONDS = 1.5
+
+def measure_once(command):
+    """启动一次程序，返回 (首个窗口显示耗时, 启动时已加载的重量级模块)"""
+    env = dict(os.environ, INVASSIST_STARTUP_BENCHMARK='1')
+    start = time.perf_counter()
+    result = subprocess.run(command, env=env, capture_output=True, text=True, timeout=60)
+    elapsed = time.perf_counter() - start
+
+    heavy_modules = []
+    for line in result.stdout.splitlines():
+        if line.startswith('{'):
+            heavy_modules = json.loads(line).get('heavy_modules', [])
+    return elapsed, heavy_modules
+
+def main(argv=None):
+    """
+    启动性能测试
+
+    用法: python startup_benchmark.py [次数] [可执行文件]
+    不指定可执行文件时测试 assistant.py，也可以传入打包后的exe路径
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    rounds = int(argv[0]) if argv else 5
+    if len(argv) > 1:
+        command = [argv[1]]
+    else:
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assistant.py')]
+
+    timings = []
+    heavy_modules = []
+    for i in range(rounds):
+        elapsed, heavy_modules = measure_once(command)
+        timings.append(elapsed)
+        print(f"第 {i + 1} 次: {elapsed:.3f} 秒")
+
+    median = statistics.median(timings)
+    print(f"中位数: {median:.3f} 秒 (目标 {TARGET_SECONDS} 秒)")
+    if heavy_modules:
+        print(f"警告：首个窗口显示前加载了 {', '.join(heavy_modules)}")
+
+    return 0 if median <= TARGET_SECONDS and not heavy_modules else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
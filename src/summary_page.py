@@ -0,0 +1,91 @@
+import fitz  # PyMuPDF
+
+# 汇总页使用A4尺寸（单位：点）与PyMuPDF内置的简体中文字体
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size('a4')
+PAGE_MARGIN = 40
+FONT_NAME = 'china-s'
+FONT_SIZE = 9
+LINE_HEIGHT = 15
+TITLE_SIZE = 16
+
+# 列标题、起始位置（点）与最大字符数
+COLUMNS = (
+    ('序号', 0, 4),
+    ('文件夹', 30, 12),
+    ('发票号码', 150, 20),
+    ('开票日期', 265, 10),
+    ('销售方', 325, 14),
+    ('金额', 460, 12),
+    ('备注', 520, 4),
+)
+
+def _truncate(text, max_chars):
+    text = '' if text is None else str(text)
+    return text if len(text) <= max_chars else text[:max_chars - 1] + '…'
+
+def _summary_rows(records):
+    """生成表格行及金额合计"""
+    rows = []
+    total = 0.0
+    missing = 0
+    for i, (folder_name, meta, is_duplicate) in enumerate(records, 1):
+        amount = meta.get('amount')
+        if amount is None:
+            missing += 1
+        else:
+            total += amount
+        rows.append((
+            i,
+            folder_name,
+            meta.get('number') or '未识别',
+            meta.get('date') or '',
+            meta.get('seller') or '',
+            f'{amount:.2f}' if amount is not None else '未识别',
+            '重复' if is_duplicate else '',
+        ))
+    return rows, total, missing
+
+def insert_summary_pages(doc, records, title='报销汇总'):
+    """
+    在文档开头插入发票汇总页，页数不足时自动续页
+
+    Args:
+        doc: 总文档
+        records: (文件夹名称, 发票信息, 是否重复) 列表
+        title: 汇总页标题
+
+    Returns:
+        插入的页数
+    """
+    rows, total, missing = _summary_rows(records)
+    rows_per_page = int((PAGE_HEIGHT - 2 * PAGE_MARGIN - 3 * LINE_HEIGHT - TITLE_SIZE) // LINE_HEIGHT)
+
+    page_count = 0
+    start = 0
+    while True:
+        page = doc.new_page(pno=page_count, width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = PAGE_MARGIN + TITLE_SIZE
+        heading = title if page_count == 0 else f'{title}（续）'
+        page.insert_text((PAGE_MARGIN, y), heading, fontname=FONT_NAME, fontsize=TITLE_SIZE)
+        y += 2 * LINE_HEIGHT
+
+        for name, x, _ in COLUMNS:
+            page.insert_text((PAGE_MARGIN + x, y), name, fontname=FONT_NAME, fontsize=FONT_SIZE)
+        y += LINE_HEIGHT
+
+        for row in rows[start:start + rows_per_page]:
+            for value, (_, x, max_chars) in zip(row, COLUMNS):
+                page.insert_text((PAGE_MARGIN + x, y), _truncate(value, max_chars),
+                                 fontname=FONT_NAME, fontsize=FONT_SIZE)
+            y += LINE_HEIGHT
+
+        start += rows_per_page
+        page_count += 1
+        if start >= len(rows):
+            break
+
+    summary = f'合计：{len(rows)} 张发票，金额 ¥{total:.2f}'
+    if missing:
+        summary += f'（{missing} 张未识别金额）'
+    page.insert_text((PAGE_MARGIN, y + LINE_HEIGHT), summary, fontname=FONT_NAME, fontsize=FONT_SIZE + 2)
+    return page_count
@@ -0,0 +1,86 @@
+import os
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtGui import QColor
+
+# 界面批量刷新间隔，约30帧每秒
+UPDATE_INTERVAL_MS = 33
+
+WARNING_COLOR = QColor(255, 200, 200)
+
+def folder_row(folder_name, pdf_count, img_count):
+    """根据PDF和图片数量生成表格行 (文件夹, PDF数量, 图片数量, 问题说明)"""
+    reasons = []
+    if pdf_count != 1:
+        reasons.append('缺少PDF')
+    if img_count < 2:
+        reasons.append('缺少图片')
+    return (folder_name, pdf_count, img_count, "、".join(reasons))
+
+def ignored_row(folder_data):
+    """将 PDFMerger.ignored_folders 中的记录转换为表格行"""
+    if len(folder_data) == 4:  # 包含PDF和图片计数的情况
+        folder_path, pdf_count, img_count, reason = folder_data
+        return folder_row(os.path.basename(folder_path), pdf_count, img_count)
+    # 处理异常情况，数量未知
+    folder_path, error = folder_data
+    return (os.path.basename(folder_path), None, None, error)
+
+class FolderTableModel(QAbstractTableModel):
+    """
+    文件夹检查结果表格模型
+
+    行数据为 (文件夹, PDF数量, 图片数量, 问题说明) 元组，不为每个单元格创建对象。
+    append_rows 以一次插入操作追加一批行，避免逐行刷新视图。
+    """
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row = self.rows[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            value = row[column]
+            return "" if value is None else str(value)
+        if role == Qt.BackgroundRole:
+            # PDF需要恰好1个，图片需要至少2张
+            if column == 1 and row[1] is not None and row[1] != 1:
+                return WARNING_COLOR
+            if column == 2 and row[2] is not None and row[2] < 2:
+                return WARNING_COLOR
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return QVariant()
+
+    def set_rows(self, rows):
+        """整体替换表格内容"""
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """在表格末尾追加一批行"""
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        """清空表格"""
+        self.set_rows([])
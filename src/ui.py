@@ -3,11 +3,17 @@ import sys
 import shutil
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QListWidget, QPushButton, QFileDialog, 
-                           QLabel, QProgressBar, QMessageBox, QTableWidget, 
-                           QTableWidgetItem, QHeaderView, QStackedWidget)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QColor, QIcon
-from pdf_merger import PDFMerger
+                           QLabel, QProgressBar, QMessageBox, QTableView, 
+                           QHeaderView, QStackedWidget, QCheckBox, QSpinBox)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QIcon
+from manifest import ProjectManifest
+from navigation import linearization_available, LINEARIZATION_UNAVAILABLE
+from table_models import FolderTableModel, folder_row, ignored_row, UPDATE_INTERVAL_MS
+
+# 默认的并发处理进程数，实际并发量还受内存预算限制；
+# 每个文件夹都在隔离的工作进程中处理，单个损坏的文件不会导致界面崩溃
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
 
 def resource_path(relative_path):
     """获取资源的绝对路径，兼容开发环境和PyInstaller打包后的环境"""
@@ -22,61 +28,78 @@ def resource_path(relative_path):
 
 class PDFProcessThread(QThread):
     progress = pyqtSignal(str, int)  # status message, folder count
-    finished = pyqtSignal(str)  # output file path
+    finished = pyqtSignal(list)  # output file paths
     error = pyqtSignal(str)
     status_update = pyqtSignal(int, int)  # success_count, ignored_count
 
-    def __init__(self, merger, folder_path, output_path=''):
+    def __init__(self, merger, folder_path, output_path='', manifest=None, summary_page=False, linear=False,
+                 update_file=None, max_bytes=None, max_pages=None, **render_options):
         super().__init__()
         self.merger = merger
         self.folder_path = folder_path
         self.output_path = output_path
+        self.manifest = manifest
+        self.render_options = render_options  # 传递给 PDFMerger.render_folders 的处理参数
+        self.summary_page = summary_page
+        self.linear = linear
+        self.update_file = update_file  # 不为None时增量更新该文件
+        # 设置后按子文件夹拆分为多个不超过上限的文件
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
         
     def run(self):
         try:
-            # 首先获取要处理的文件夹列表
-            subfolders = [os.path.join(self.folder_path, subfolder) 
-                         for subfolder in os.listdir(self.folder_path) 
-                         if os.path.isdir(os.path.join(self.folder_path, subfolder))]
+            # 与命令行和服务模式共用 PDFMerger 中按工作量计算的进度与预计剩余时间
+            self.merger.progress_callback = self._reportProgress
+            if self.update_file:
+                self.progress.emit("正在增量更新...", 0)
+                self.merger.update_output(self.folder_path, self.update_file, **self.render_options)
+                self.status_update.emit(self.merger.folder_count, len(self.merger.ignored_folders))
+                self.finished.emit([self.update_file])
+                return
             
-            doc = None
-            try:
-                doc = self.merger.create_document()
-                total = len(subfolders)
-                success_count = 0
-                
-                for i, subfolder_path in enumerate(subfolders, 1):
-                    folder_name = os.path.basename(subfolder_path)
-                    self.progress.emit(f"正在处理: {folder_name} ({i}/{total})", int((i / total) * 100))
-                    if self.merger.merge_invoice_and_images_to_total_pdf(subfolder_path, doc):
-                        success_count += 1
-                    self.status_update.emit(success_count, len(self.merger.ignored_folders))
-                
-                if self.merger.folder_count > 0:
-                    # 保存文件
-                    timestamp = self.merger.get_timestamp()
-                    parent_folder_name = os.path.basename(os.path.abspath(self.folder_path))
-                    output_filename = f'{parent_folder_name}_报销单_自动生成_{self.merger.folder_count}张发票_{timestamp}.pdf'
-                    output_path = os.path.join(self.folder_path, output_filename)
-                    
-                    doc.save(output_path)
-                    self.finished.emit(output_path)
-                else:
-                    self.error.emit("没有成功处理任何文件夹")
-            finally:
-                if doc:
-                    doc.close()
+            # 读取发票信息并检查重复发票，之后逐个处理文件夹；输出到项目文件夹
+            self.progress.emit("正在读取发票信息...", 0)
+            output_files = self.merger.process_all_subfolders_to_total_pdf(
+                self.folder_path, self.folder_path, max_bytes=self.max_bytes, max_pages=self.max_pages,
+                manifest=self.manifest, summary_page=self.summary_page, linear=self.linear,
+                **self.render_options)
+            if output_files:
+                self.finished.emit(output_files)
+            else:
+                self.error.emit("没有成功处理任何文件夹")
                     
         except Exception as e:
             self.error.emit(str(e))
 
+    def _reportProgress(self, subfolder_path, done, total):
+        """由 PDFMerger 在每个文件夹处理完成后调用"""
+        from progress_model import format_duration
+        model = self.merger.progress_model
+        action = "已重新处理" if self.update_file else "已处理"
+        eta = format_duration(model.eta())
+        self.progress.emit(f"{action}: {os.path.basename(subfolder_path)} ({done}/{total})，预计剩余 {eta}",
+                           int(model.progress() * 100))
+        self.status_update.emit(self.merger.folder_count, len(self.merger.ignored_folders))
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.merger = PDFMerger(debug_mode=True)
+        self.merger = None  # 开始处理时创建，避免启动时加载PyMuPDF和Pillow
         self.current_path = os.getcwd()
         self.selected_folder = None
+        self.manifest = None
         self.output_file = None
+        self.output_files = []  # 拆分输出时的全部文件，output_file 为其中第一个
+        self.executor = None  # 常驻的隔离工作进程，多次处理之间复用以省去启动和预热
+        
+        # 处理过程中的界面更新按固定帧率合并刷新
+        self._pending_progress = None
+        self._pending_stats = None
+        self._ignored_shown = 0
+        self.update_timer = QTimer(self)
+        self.update_timer.setInterval(UPDATE_INTERVAL_MS)
+        self.update_timer.timeout.connect(self._flushProcessUpdates)
         
         # 设置窗口图标，使用兼容打包环境的路径
         icon_path = resource_path(os.path.join('icon', 'icon.ico'))
@@ -147,9 +170,10 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout(page)
         
         # 创建表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["文件夹", "PDF文件", "图片文件", "问题说明"])
+        self.table_model = FolderTableModel(["文件夹", "PDF文件", "图片文件", "问题说明"], self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
@@ -159,12 +183,41 @@ class MainWindow(QMainWindow):
 
         # 添加刷新按钮
         button_layout = QHBoxLayout()
+        self.summary_checkbox = QCheckBox("在开头插入发票汇总页")
+        button_layout.addWidget(self.summary_checkbox)
+        self.linear_checkbox = QCheckBox("快速网页视图")
+        self.linear_checkbox.setToolTip("保存为线性化PDF，在浏览器中打开大文件时可先显示首页")
+        if not linearization_available():
+            self.linear_checkbox.setEnabled(False)
+            self.linear_checkbox.setToolTip(LINEARIZATION_UNAVAILABLE)
+        button_layout.addWidget(self.linear_checkbox)
+        self.placement_checkbox = QCheckBox("保留原图画质")
+        self.placement_checkbox.setToolTip("直接将原图放置到页面上，JPEG图片不重新压缩，处理也更快")
+        button_layout.addWidget(self.placement_checkbox)
         self.report_refresh_button = QPushButton("刷新")
         self.report_refresh_button.clicked.connect(self.refreshFolder)
         button_layout.addStretch()
         button_layout.addWidget(self.report_refresh_button)
         layout.addLayout(button_layout)
 
+        # 报销平台限制上传文件大小时，按子文件夹拆分为多个文件
+        split_layout = QHBoxLayout()
+        split_layout.addWidget(QLabel("单个文件上限:"))
+        self.max_size_spinbox = QSpinBox()
+        self.max_size_spinbox.setRange(0, 1024)
+        self.max_size_spinbox.setSuffix(" MB")
+        self.max_size_spinbox.setSpecialValueText("不限大小")
+        self.max_size_spinbox.valueChanged.connect(self.updateSplitOptions)
+        split_layout.addWidget(self.max_size_spinbox)
+        self.max_pages_spinbox = QSpinBox()
+        self.max_pages_spinbox.setRange(0, 9999)
+        self.max_pages_spinbox.setSuffix(" 页")
+        self.max_pages_spinbox.setSpecialValueText("不限页数")
+        self.max_pages_spinbox.valueChanged.connect(self.updateSplitOptions)
+        split_layout.addWidget(self.max_pages_spinbox)
+        split_layout.addStretch()
+        layout.addLayout(split_layout)
+
         self.stack.addWidget(page)
 
     def createProcessPage(self):
@@ -193,9 +246,10 @@ class MainWindow(QMainWindow):
         list_layout.setContentsMargins(0, 10, 0, 10)  # 添加上下间距
         
         list_layout.addWidget(QLabel("处理失败的文件夹:"))
-        self.ignored_list = QTableWidget()
-        self.ignored_list.setColumnCount(4)
-        self.ignored_list.setHorizontalHeaderLabels(["文件夹", "PDF文件", "图片文件", "原因"])
+        self.ignored_model = FolderTableModel(["文件夹", "PDF文件", "图片文件", "原因"], self)
+        self.ignored_list = QTableView()
+        self.ignored_list.setModel(self.ignored_model)
+        self.ignored_list.verticalHeader().setDefaultSectionSize(24)
         header = self.ignored_list.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
@@ -221,16 +275,20 @@ class MainWindow(QMainWindow):
         self.move_button = QPushButton("移动文件")
         self.delete_button = QPushButton("删除文件")
         self.regenerate_button = QPushButton("重新处理")
+        self.update_button = QPushButton("更新文件")
+        self.update_button.setToolTip("只重新处理新增或发生变化的文件夹，未变化的页面保持不动")
         
         file_ops_layout.addWidget(self.open_button)
         file_ops_layout.addWidget(self.move_button)
         file_ops_layout.addWidget(self.delete_button)
         file_ops_layout.addWidget(self.regenerate_button)
+        file_ops_layout.addWidget(self.update_button)
         
         self.open_button.clicked.connect(self.openFile)
         self.move_button.clicked.connect(self.moveFile)
         self.delete_button.clicked.connect(self.deleteFile)
         self.regenerate_button.clicked.connect(self.regenerateFile)
+        self.update_button.clicked.connect(self.updateFile)
         
         result_layout.addWidget(self.file_ops_widget)
         layout.addWidget(result_group)
@@ -300,54 +358,36 @@ class MainWindow(QMainWindow):
         if not self.selected_folder:
             return
             
-        subfolders = [f for f in os.listdir(self.selected_folder) 
-                     if os.path.isdir(os.path.join(self.selected_folder, f))]
+        # 读取项目清单，仅重新扫描发生变化的文件夹
+        if self.manifest is None or self.manifest.base_folder != os.path.abspath(self.selected_folder):
+            self.manifest = ProjectManifest(self.selected_folder)
+        self.manifest.scan()
         
-        self.table.setRowCount(len(subfolders))
-        
-        valid_count = 0  # 统计符合条件的文件夹数
-        total_count = len(subfolders)  # 总文件夹数
-        
-        for i, folder in enumerate(subfolders):
-            folder_path = os.path.join(self.selected_folder, folder)
-            files = os.listdir(folder_path)
-            pdf_count = len([f for f in files if f.lower().endswith('.pdf')])
-            img_count = len([f for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg'))])
-            
-            # 检查是否符合条件
-            if pdf_count == 1 and img_count >= 2:
-                valid_count += 1
-            
-            # 设置表格项
-            folder_item = QTableWidgetItem(folder)
-            pdf_item = QTableWidgetItem(str(pdf_count))
-            img_item = QTableWidgetItem(str(img_count))
-            reason_item = QTableWidgetItem("")
-            
-            # 设置颜色和原因
-            reasons = []
-            if pdf_count != 1:
-                pdf_item.setBackground(QColor(255, 200, 200))
-                reasons.append(f'缺少PDF')
-            if img_count < 2:
-                img_item.setBackground(QColor(255, 200, 200))
-                reasons.append(f'缺少图片')
-            
-            if reasons:
-                reason_item.setText("、".join(reasons))
-                
-            self.table.setItem(i, 0, folder_item)
-            self.table.setItem(i, 1, pdf_item)
-            self.table.setItem(i, 2, img_item)
-            self.table.setItem(i, 3, reason_item)
+        # 一次性替换表格内容
+        self.table_model.set_rows(folder_row(entry['name'], entry['pdf_count'], entry['img_count'])
+                                  for _, entry in self.manifest.folder_entries())
         
         # 保存统计信息供updateNavButtons使用
-        self.folder_stats = (valid_count, total_count)
+        self.folder_stats = self.manifest.stats()
         self.updateNavButtons()
 
+    def updateSplitOptions(self):
+        """拆分输出时各分卷分别保存，不支持发票汇总页"""
+        split = self.max_size_spinbox.value() > 0 or self.max_pages_spinbox.value() > 0
+        if split:
+            self.summary_checkbox.setChecked(False)
+        self.summary_checkbox.setEnabled(not split)
+        self.summary_checkbox.setToolTip("拆分输出时不支持发票汇总页" if split else "")
+
     def startProcessing(self):
-        self.merger = PDFMerger(debug_mode=True)
-        self.thread = PDFProcessThread(self.merger, self.selected_folder)
+        from pdf_merger import PDFMerger
+        self.merger = PDFMerger(debug_mode=True, image_placement=self.placement_checkbox.isChecked())
+        self.thread = PDFProcessThread(self.merger, self.selected_folder, manifest=self.manifest,
+                                       summary_page=self.summary_checkbox.isChecked(),
+                                       linear=self.linear_checkbox.isChecked(),
+                                       max_bytes=self.max_size_spinbox.value() * 1024 * 1024 or None,
+                                       max_pages=self.max_pages_spinbox.value() or None,
+                                       workers=DEFAULT_WORKERS, executor=self._getExecutor())
         self.thread.progress.connect(self.updateProgress)
         self.thread.status_update.connect(self.updateStats)
         self.thread.finished.connect(self.processingFinished)
@@ -358,59 +398,67 @@ class MainWindow(QMainWindow):
         self.next_button.setEnabled(False)
         
         # 清空忽略列表
-        self.ignored_list.setRowCount(0)
+        self.ignored_model.clear()
+        self._ignored_shown = 0
+        self._pending_progress = None
+        self._pending_stats = None
         self.stats_label.setText("")
+        self.update_timer.start()
+
+    def _getExecutor(self):
+        """获取常驻的隔离执行器，首次处理时创建"""
+        if self.executor is None:
+            from isolation import IsolatedExecutor
+            self.executor = IsolatedExecutor(DEFAULT_WORKERS)
+        return self.executor
+
+    def closeEvent(self, event):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        super().closeEvent(event)
 
     def updateProgress(self, status, progress):
-        self.status_label.setText(status)
-        self.progress_bar.setValue(progress)
-        if progress == 100:
-            self.status_label.setText("处理完成，正在生成PDF文件...")
+        # 仅记录最新进度，由定时器统一刷新界面
+        self._pending_progress = (status, progress)
 
     def updateStats(self, success_count, ignored_count):
-        self.stats_label.setText(f"成功: {success_count} 个文件夹，忽略: {ignored_count} 个文件夹")
-        
-        # 更新忽略文件夹列表
-        self.ignored_list.setRowCount(len(self.merger.ignored_folders))
-        self._updateIgnoredList(self.ignored_list)
-
-    def _updateIgnoredList(self, table_widget):
-        """更新忽略文件夹列表到指定的表格部件"""
-        table_widget.setRowCount(len(self.merger.ignored_folders))
-        for i, folder_data in enumerate(self.merger.ignored_folders):
-            if len(folder_data) == 4:  # 包含PDF和图片计数的情况
-                folder_path, pdf_count, img_count, reason = folder_data
-                folder_name = os.path.basename(folder_path)
-                
-                folder_item = QTableWidgetItem(folder_name)
-                pdf_item = QTableWidgetItem(str(pdf_count))
-                img_item = QTableWidgetItem(str(img_count))
-                reason_item = QTableWidgetItem("")  # 创建原因列
-                
-                # 设置颜色并生成原因文本
-                reasons = []
-                if pdf_count != 1:
-                    pdf_item.setBackground(QColor(255, 200, 200))
-                    reasons.append(f"缺少PDF")
-                if img_count < 2:
-                    img_item.setBackground(QColor(255, 200, 200))
-                    reasons.append(f"缺少图片")
-                
-                reason_item.setText("、".join(reasons))
-                    
-                table_widget.setItem(i, 0, folder_item)
-                table_widget.setItem(i, 1, pdf_item)
-                table_widget.setItem(i, 2, img_item)
-                table_widget.setItem(i, 3, reason_item)  # 添加原因列
-
-    def processingFinished(self, output_file):
-        self.output_file = output_file
+        self._pending_stats = (success_count, ignored_count)
+
+    def _flushProcessUpdates(self):
+        """按固定帧率将最新的进度、统计信息和新增的忽略文件夹刷新到界面"""
+        if self._pending_progress is not None:
+            status, progress = self._pending_progress
+            self._pending_progress = None
+            self.status_label.setText(status)
+            self.progress_bar.setValue(progress)
+            if progress == 100:
+                self.status_label.setText("处理完成，正在生成PDF文件...")
+        
+        if self._pending_stats is not None:
+            success_count, ignored_count = self._pending_stats
+            self._pending_stats = None
+            self.stats_label.setText(f"成功: {success_count} 个文件夹，忽略: {ignored_count} 个文件夹")
+        
+        self._updateIgnoredList()
+
+    def _updateIgnoredList(self):
+        """将新增的忽略文件夹追加到忽略列表"""
+        ignored_folders = self.merger.ignored_folders[self._ignored_shown:]
+        if ignored_folders:
+            self._ignored_shown += len(ignored_folders)
+            self.ignored_model.append_rows([ignored_row(folder_data) for folder_data in ignored_folders])
+
+    def processingFinished(self, output_files):
+        self.output_files = output_files
+        self.output_file = output_files[0]
+        
+        # 刷新剩余的界面更新
+        self.update_timer.stop()
+        self._flushProcessUpdates()
+        
         self.status_label.setText("处理完成！")
         self.progress_bar.setValue(100)
-        self.result_label.setText(f"文件已保存到：{output_file}")
-        
-        # 更新忽略的文件夹列表
-        self._updateIgnoredList(self.ignored_list)
+        self.result_label.setText("文件已保存到：" + "\n".join(output_files))
         
         # 显示文件操作按钮，隐藏导航按钮
         self.file_ops_widget.show()
@@ -422,8 +470,25 @@ class MainWindow(QMainWindow):
         self.move_button.setEnabled(True)
         self.delete_button.setEnabled(True)
         self.regenerate_button.setEnabled(True)
+        # 拆分输出的文件不支持增量更新
+        self.update_button.setEnabled(len(output_files) == 1)
+        
+        self._showDuplicateInvoices()
+
+    def _showDuplicateInvoices(self):
+        """提示重复的发票"""
+        from invoice_index import describe_invoice
+        lines = []
+        for folder_path, (meta, others) in self.merger.invoice_records.items():
+            if others:
+                lines.append(f"{os.path.basename(folder_path)}（{describe_invoice(meta)}）与：")
+                lines.extend(f"    {other_path}" for other_path in others)
+        if lines:
+            QMessageBox.warning(self, "发现重复发票", "以下发票与其他文件重复：\n" + "\n".join(lines))
 
     def processingError(self, error_message):
+        self.update_timer.stop()
+        self._flushProcessUpdates()
         self.status_label.setText("处理出错！")
         QMessageBox.critical(self, "错误", f"处理过程中出现错误：{error_message}")
         self.stack.setCurrentIndex(1)  # 返回到报告页面
@@ -440,11 +505,16 @@ class MainWindow(QMainWindow):
         target_dir = QFileDialog.getExistingDirectory(self, "选择目标文件夹")
         if target_dir:
             try:
-                new_path = os.path.join(target_dir, os.path.basename(self.output_file))
-                shutil.move(self.output_file, new_path)
-                self.output_file = new_path
-                self.result_label.setText(f"文件已移动到：{new_path}")
-                QMessageBox.information(self, "成功", f"文件已移动到：{new_path}")
+                # 拆分输出时一并移动所有分卷
+                new_paths = []
+                for output_file in self.output_files:
+                    new_path = os.path.join(target_dir, os.path.basename(output_file))
+                    shutil.move(output_file, new_path)
+                    new_paths.append(new_path)
+                self.output_files = new_paths
+                self.output_file = new_paths[0]
+                self.result_label.setText("文件已移动到：" + "\n".join(new_paths))
+                QMessageBox.information(self, "成功", f"文件已移动到：{target_dir}")
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"移动文件时出错：{str(e)}")
 
@@ -459,9 +529,11 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.Yes:
             try:
-                os.remove(self.output_file)
+                for output_file in self.output_files:
+                    os.remove(output_file)
                 QMessageBox.information(self, "成功", "文件已删除")
                 self.output_file = None
+                self.output_files = []
                 self.result_label.setText("文件已删除")
                 
                 # 更新按钮状态
@@ -469,6 +541,7 @@ class MainWindow(QMainWindow):
                 self.move_button.setEnabled(False)
                 self.delete_button.setEnabled(False)
                 self.regenerate_button.setEnabled(True)
+                self.update_button.setEnabled(False)
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"删除文件时出错：{str(e)}")
 
@@ -497,22 +570,12 @@ class MainWindow(QMainWindow):
         self.stats_label.clear()
         self.result_label.clear()
             
-        # 重新分析文件夹
-        subfolders = [f for f in os.listdir(self.selected_folder) 
-                     if os.path.isdir(os.path.join(self.selected_folder, f))]
-        
-        has_invalid = False
-        for folder in subfolders:
-            folder_path = os.path.join(self.selected_folder, folder)
-            files = os.listdir(folder_path)
-            pdf_count = len([f for f in files if f.lower().endswith('.pdf')])
-            img_count = len([f for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg'))])
-            
-            if pdf_count != 1 or img_count < 2:
-                has_invalid = True
-                break
+        # 重新扫描项目清单
+        if self.manifest is None:
+            self.manifest = ProjectManifest(self.selected_folder)
+        valid_count, total_count = self.manifest.scan().stats()
         
-        if not has_invalid:
+        if valid_count == total_count:
             reply = QMessageBox.question(self, "确认", 
                                      "所有发票都已符合条件，是否重新处理？",
                                      QMessageBox.Yes | QMessageBox.No)
@@ -522,22 +585,52 @@ class MainWindow(QMainWindow):
             # 更新显示
             self.analyzeFolder()
 
+    def updateFile(self):
+        """增量更新已生成的PDF文件"""
+        if not self.output_file or not os.path.exists(self.output_file):
+            QMessageBox.warning(self, "警告", "找不到输出文件!")
+            return
+        
+        from pdf_merger import PDFMerger
+        self.merger = PDFMerger(debug_mode=True, image_placement=self.placement_checkbox.isChecked())
+        self.thread = PDFProcessThread(self.merger, self.selected_folder, manifest=self.manifest,
+                                       update_file=self.output_file,
+                                       workers=DEFAULT_WORKERS, executor=self._getExecutor())
+        self.thread.progress.connect(self.updateProgress)
+        self.thread.status_update.connect(self.updateStats)
+        self.thread.finished.connect(self.processingFinished)
+        self.thread.error.connect(self.processingError)
+        self.thread.start()
+        
+        self.file_ops_widget.hide()
+        self.result_label.clear()
+        self.progress_bar.setValue(0)
+        self.ignored_model.clear()
+        self._ignored_shown = 0
+        self._pending_progress = None
+        self._pending_stats = None
+        self.stats_label.setText("")
+        self.update_timer.start()
+
     def regenerateFile(self):
         """重新处理PDF文件"""
-        if self.output_file and os.path.exists(self.output_file):
-            try:
-                os.remove(self.output_file)
-            except Exception as e:
-                QMessageBox.warning(self, "警告", f"删除原文件时出错：{str(e)}")
-                return
+        try:
+            for output_file in self.output_files:
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+        except Exception as e:
+            QMessageBox.warning(self, "警告", f"删除原文件时出错：{str(e)}")
+            return
         
         # 清空所有状态
         self.output_file = None
+        self.output_files = []
         self.result_label.clear()
         self.status_label.setText("准备处理...")
         self.progress_bar.setValue(0)
         self.stats_label.clear()
-        self.ignored_list.setRowCount(0)
+        self.ignored_model.clear()
+        self._ignored_shown = 0
         
         # 返回到报告页面并更新界面状态
         self.stack.setCurrentIndex(1)
@@ -0,0 +1,52 @@
+import os
+import sys
+import pytest
+
+# 源码以脚本方式组织（src 下的模块互相直接导入），测试时同样将 src 加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+def _write_invoice(path):
+    import fitz  # PyMuPDF
+    invoice = fitz.open()
+    page = invoice.new_page(width=595, height=380)
+    page.insert_text((50, 80), 'Invoice No. 12345678', fontsize=14)
+    invoice.save(path)
+    invoice.close()
+
+def _write_screenshot(path, shade):
+    from PIL import Image, ImageDraw
+    img = Image.new('RGB', (3000, 2000), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for y in range(0, 2000, 100):
+        draw.rectangle((100, y + 20, 2900, y + 60), fill=(shade, 120, 200))
+    img.save(path)
+
+@pytest.fixture(autouse=True)
+def isolated_invoice_index(tmp_path, monkeypatch):
+    """将跨项目的发票索引重定向到临时目录，测试不读写用户目录下的真实索引"""
+    import invoice_index
+    monkeypatch.setattr(invoice_index, 'INDEX_PATH', str(tmp_path / 'invoice_index.json'))
+
+@pytest.fixture
+def make_project(tmp_path):
+    """
+    创建报销项目文件夹
+
+    每个子文件夹包含单页发票、两张大尺寸PNG截图和一张JPEG照片，可选加入一张 NEWPAGE 图片。
+    返回项目文件夹路径。
+    """
+    def _make(folder_names=('餐费',), newpage=False):
+        from PIL import Image
+        base_folder = os.path.join(str(tmp_path), '项目')
+        for name in folder_names:
+            folder = os.path.join(base_folder, name)
+            os.makedirs(folder)
+            _write_invoice(os.path.join(folder, '发票.pdf'))
+            for i in range(2):
+                _write_screenshot(os.path.join(folder, f'截图{i}.png'), 30 * i)
+            photo = Image.linear_gradient('L').resize((1600, 1200)).convert('RGB')
+            photo.save(os.path.join(folder, '照片.jpg'), quality=85)
+            if newpage:
+                _write_screenshot(os.path.join(folder, 'NEWPAGE附件.png'), 90)
+        return base_folder
+    return _make
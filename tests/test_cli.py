@@ -0,0 +1,9 @@
+import pytest
+from cli import main
+
+@pytest.mark.parametrize('split_option', [['--max-size', '10'], ['--max-pages', '20']])
+def test_summary_with_split_output_is_rejected(tmp_path, split_option, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        main([str(tmp_path), '--summary'] + split_option)
+    assert exc_info.value.code == 2
+    assert '汇总页' in capsys.readouterr().err
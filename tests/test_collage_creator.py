@@ -0,0 +1,41 @@
+import os
+from PIL import Image
+import collage_creator
+from collage_creator import resize_images, iter_resized_images, DECODE_THREADS
+
+def _save_images(folder, count, size=(1200, 800)):
+    paths = []
+    for i in range(count):
+        path = os.path.join(str(folder), f'NEWPAGE{i}.png')
+        Image.new('RGB', size, (i * 20 % 256, 100, 200)).save(path)
+        paths.append(path)
+    return paths
+
+def _is_released(img):
+    """图像已关闭（不再持有像素数据）"""
+    try:
+        return img.im is None
+    except ValueError:  # 新版Pillow访问已关闭的图像时抛出异常
+        return True
+
+def test_resize_images_releases_originals(tmp_path):
+    images = [Image.open(path) for path in _save_images(tmp_path, 4)]
+    resized = resize_images(images, [(300, 200)] * 4)
+    assert [img.size for img in resized] == [(300, 200)] * 4
+    # 缩放后原图的像素数据已释放
+    assert all(_is_released(img) for img in images)
+
+def test_iter_resized_images_limits_decodes_in_flight(tmp_path, monkeypatch):
+    paths = _save_images(tmp_path, 10)
+    submitted = []
+    load = collage_creator._load_resized_path
+    monkeypatch.setattr(collage_creator, '_load_resized_path',
+                        lambda path, size: submitted.append(path) or load(path, size))
+
+    consumed = 0
+    for img in iter_resized_images(paths, [(300, 200)] * len(paths)):
+        consumed += 1
+        assert img.size == (300, 200)
+        # 调用方尚未处理的图片不超过 DECODE_THREADS 张
+        assert len(submitted) - consumed < max(DECODE_THREADS, 1)
+    assert consumed == len(paths)
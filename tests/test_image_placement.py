@@ -0,0 +1,34 @@
+import os
+import fitz  # PyMuPDF
+import pytest
+from pdf_merger import PDFMerger
+
+def _render(base_folder, output_path, image_placement, **render_options):
+    merger = PDFMerger(image_placement=image_placement)
+    output_files = merger.process_all_subfolders_to_total_pdf(base_folder, output_path, **render_options)
+    assert len(output_files) == 1
+    return os.path.getsize(output_files[0])
+
+@pytest.mark.parametrize('render_options', [{}, {'workers': 2}])
+def test_placement_output_size_in_line_with_raster(tmp_path, make_project, render_options):
+    base_folder = make_project()
+    raster_size = _render(base_folder, str(tmp_path / 'raster.pdf'), False, **render_options)
+    placement_size = _render(base_folder, str(tmp_path / 'placement.pdf'), True, **render_options)
+    # 直接放置的图片在保存时必须压缩，否则PNG以原始像素保存，文件会大出数十倍
+    assert placement_size < raster_size * 2
+
+    folder = os.path.join(base_folder, '餐费')
+    input_size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+    assert placement_size < input_size * 2
+
+def test_placement_keeps_jpeg_stream(tmp_path, make_project):
+    base_folder = make_project()
+    output_path = str(tmp_path / 'placement.pdf')
+    _render(base_folder, output_path, True)
+
+    with open(os.path.join(base_folder, '餐费', '照片.jpg'), 'rb') as f:
+        jpeg_data = f.read()
+    doc = fitz.open(output_path)
+    streams = [doc.xref_stream_raw(xref) for xref in range(1, doc.xref_length())
+               if doc.xref_get_key(xref, 'Subtype')[1] == '/Image']
+    assert jpeg_data in streams
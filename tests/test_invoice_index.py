@@ -0,0 +1,60 @@
+import os
+import time
+import fitz  # PyMuPDF
+from invoice_index import InvoiceIndex, file_hash
+from manifest import ProjectManifest
+from pdf_merger import PDFMerger
+
+def _write_invoice(path, number, code=None):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=380)
+    if code:
+        page.insert_text((50, 50), f'发票代码：{code}', fontname='china-s', fontsize=14)
+    page.insert_text((50, 80), f'发票号码：{number}', fontname='china-s', fontsize=14)
+    doc.save(path)
+    doc.close()
+
+def test_invoice_overwritten_in_place_is_reindexed(tmp_path, make_project):
+    base_folder = make_project()
+    folder = os.path.join(base_folder, '餐费')
+    pdf_path = os.path.join(folder, '发票.pdf')
+    _write_invoice(pdf_path, '12345678')
+    past = time.time() - 10
+    os.utime(folder, (past, past))
+
+    index = InvoiceIndex(path=str(tmp_path / 'index.json'))
+    manifest = ProjectManifest(base_folder).scan()
+    merger = PDFMerger()
+    merger.inspect_folders(manifest.folder_entries(), index)
+    assert merger.invoice_records[folder][0]['number'] == '12345678'
+    manifest.save()
+
+    # 原地覆盖同名发票：目录修改时间不变，清单条目会被直接复用
+    _write_invoice(pdf_path, '87654321')
+    os.utime(pdf_path, (past + 5, past + 5))
+    os.utime(folder, (past, past))
+
+    manifest = ProjectManifest(base_folder).scan()
+    assert manifest.changed == []
+    merger = PDFMerger()
+    merger.inspect_folders(manifest.folder_entries(), index)
+    assert merger.invoice_records[folder][0]['number'] == '87654321'
+    assert manifest.entries['餐费']['invoice']['hash'] == file_hash(pdf_path)
+
+def test_duplicates_are_keyed_on_invoice_code_and_number(tmp_path):
+    paths = {}
+    for name, number, code in (('a', '00123456', '044001900111'), ('b', '00123456', '044001900222'),
+                               ('c', '00123456', '044001900111'), ('d', '24442000000012345678', None)):
+        paths[name] = str(tmp_path / f'{name}.pdf')
+        _write_invoice(paths[name], number, code)
+
+    index = InvoiceIndex(path=str(tmp_path / 'index.json'))
+    for path in paths.values():
+        index.index_file(path)
+    assert index.invoices[file_hash(paths['a'])]['code'] == '044001900111'
+    assert index.invoices[file_hash(paths['d'])]['code'] is None
+
+    # 发票号码相同但发票代码不同的旧版发票不是重复发票
+    assert index.duplicates_of(paths['a']) == [paths['c']]
+    assert index.duplicates_of(paths['b']) == []
+    assert index.duplicates_of(paths['d']) == []
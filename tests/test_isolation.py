@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import fitz  # PyMuPDF
+import pytest
+import scheduler
+from isolation import IsolatedWorker, FolderTimeoutError, WorkerCrashedError
+from pdf_merger import PDFMerger
+
+def _render_or_fail(folder_path, entry, debug_mode=False, image_placement=False):
+    """在工作进程中代替 render_folder：按子文件夹名称模拟崩溃或卡死"""
+    name = os.path.basename(folder_path)
+    if name == '崩溃':
+        os._exit(3)
+    if name == '卡死':
+        time.sleep(60)
+    return scheduler.render_folder(folder_path, entry, debug_mode, image_placement)
+
+def _inspect_or_crash(folder_path, entry, read_invoice=True, debug_mode=False):
+    """在工作进程中代替 inspect_folder：读取名为“崩溃”的子文件夹时进程异常退出"""
+    if os.path.basename(folder_path) == '崩溃':
+        os._exit(3)
+    return scheduler.inspect_folder(folder_path, entry, read_invoice, debug_mode)
+
+def test_timeout_kills_worker_and_next_call_restarts():
+    worker = IsolatedWorker(timeout=1)
+    try:
+        first_pid = worker.call(os.getpid)
+        with pytest.raises(FolderTimeoutError):
+            worker.call(time.sleep, 10)
+        assert worker.process is None
+        assert worker.call(os.getpid) != first_pid
+    finally:
+        worker.close()
+
+def test_crash_reports_exit_code():
+    worker = IsolatedWorker(timeout=30)
+    try:
+        with pytest.raises(WorkerCrashedError, match='退出码 3'):
+            worker.call(os._exit, 3)
+        assert worker.call(sum, [1, 2]) == 3
+    finally:
+        worker.close()
+
+@pytest.mark.skipif(sys.platform == 'darwin', reason='macOS 不支持 RLIMIT_AS')
+def test_memory_limit_surfaces_as_error():
+    worker = IsolatedWorker(timeout=30, memory_limit=1024 * 1024 * 1024)
+    try:
+        with pytest.raises(RuntimeError, match='超出内存限制'):
+            worker.call(bytearray, 2 * 1024 * 1024 * 1024)
+        # MemoryError 在工作进程内被捕获，进程本身仍可继续使用
+        assert worker.call(sum, [1, 2]) == 3
+    finally:
+        worker.close()
+
+def test_failed_folders_become_ignored_records(tmp_path, make_project, monkeypatch):
+    base_folder = make_project(('餐费', '崩溃', '卡死', '交通'))
+    monkeypatch.setattr(scheduler, 'render_folder', _render_or_fail)
+
+    merger = PDFMerger()
+    output_files = merger.process_all_subfolders_to_total_pdf(base_folder, str(tmp_path / 'out.pdf'),
+                                                              isolate=True, timeout=10)
+
+    # 崩溃与卡死的文件夹记为忽略，其余文件夹照常输出
+    assert [os.path.basename(path) for path in merger.success_folders] == ['餐费', '交通']
+    reasons = {os.path.basename(folder_data[0]): folder_data[-1] for folder_data in merger.ignored_folders}
+    assert set(reasons) == {'崩溃', '卡死'}
+    assert '退出码' in reasons['崩溃']
+    assert '超时' in reasons['卡死']
+    with fitz.open(output_files[0]) as doc:
+        assert doc.page_count == 2
+
+def test_failed_inspection_becomes_ignored_record(tmp_path, make_project, monkeypatch):
+    base_folder = make_project(('餐费', '崩溃'))
+    monkeypatch.setattr(scheduler, 'inspect_folder', _inspect_or_crash)
+
+    merger = PDFMerger()
+    output_files = merger.process_all_subfolders_to_total_pdf(base_folder, str(tmp_path / 'out.pdf'),
+                                                              isolate=True, timeout=30)
+
+    # 读取发票信息时崩溃的文件夹不会在当前进程中打开，也不再渲染
+    assert [os.path.basename(path) for path in merger.success_folders] == ['餐费']
+    assert [os.path.basename(folder_data[0]) for folder_data in merger.ignored_folders] == ['崩溃']
+    assert '退出码' in merger.ignored_folders[0][-1]
+    assert os.path.join(base_folder, '崩溃') not in merger.invoice_records
+    assert len(output_files) == 1
@@ -0,0 +1,50 @@
+import os
+import time
+import manifest
+from manifest import ProjectManifest
+from pdf_merger import PDFMerger
+
+def _age_folders(base_folder, seconds=10):
+    """将子文件夹的修改时间提前，使其超出修改时间精度窗口"""
+    past = time.time() - seconds
+    for name in os.listdir(base_folder):
+        path = os.path.join(base_folder, name)
+        if os.path.isdir(path):
+            os.utime(path, (past, past))
+
+def _count_rescans(monkeypatch):
+    scanned = []
+    scan_folder = manifest.scan_folder
+    monkeypatch.setattr(manifest, 'scan_folder',
+                        lambda folder_path, dir_stat=None: scanned.append(folder_path) or scan_folder(folder_path, dir_stat))
+    return scanned
+
+def test_scan_after_merge_relists_nothing(tmp_path, make_project, monkeypatch):
+    base_folder = make_project(('餐费', '交通', '住宿'), newpage=True)
+    _age_folders(base_folder)
+    assert sorted(ProjectManifest(base_folder).scan().changed) == ['交通', '住宿', '餐费']
+
+    output_files = PDFMerger().process_all_subfolders_to_total_pdf(base_folder, str(tmp_path / 'out.pdf'))
+    assert len(output_files) == 1
+
+    # 处理后重新打开项目时，未变化的子文件夹不应被重新列举
+    scanned = _count_rescans(monkeypatch)
+    reopened = ProjectManifest(base_folder).scan()
+    assert scanned == []
+    assert reopened.changed == [] and reopened.removed == []
+    assert reopened.stats() == (3, 3)
+
+def test_scan_relists_only_changed_folder(make_project, monkeypatch):
+    base_folder = make_project(('餐费', '交通'))
+    _age_folders(base_folder)
+    ProjectManifest(base_folder).scan()
+
+    changed_folder = os.path.join(base_folder, '交通')
+    os.remove(os.path.join(changed_folder, '发票.pdf'))
+    past = time.time() - 5
+    os.utime(changed_folder, (past, past))
+    scanned = _count_rescans(monkeypatch)
+    reopened = ProjectManifest(base_folder).scan()
+    assert [os.path.basename(path) for path in scanned] == ['交通']
+    assert reopened.changed == ['交通']
+    assert reopened.stats() == (1, 2)
@@ -0,0 +1,20 @@
+import os
+import pytest
+from pdf_merger import PDFMerger
+
+@pytest.mark.parametrize('image_placement', [False, True])
+def test_render_leaves_input_folders_untouched(tmp_path, make_project, image_placement):
+    base_folder = make_project(('餐费', '交通'), newpage=True)
+    before = {name: (sorted(os.listdir(os.path.join(base_folder, name))),
+                     os.stat(os.path.join(base_folder, name)).st_mtime_ns)
+              for name in ('餐费', '交通')}
+
+    merger = PDFMerger(image_placement=image_placement)
+    output_files = merger.process_all_subfolders_to_total_pdf(base_folder, str(tmp_path / 'out.pdf'))
+    assert len(output_files) == 1
+
+    # 处理过程中不在子文件夹内创建任何文件（包括临时文件），目录修改时间保持不变
+    after = {name: (sorted(os.listdir(os.path.join(base_folder, name))),
+                    os.stat(os.path.join(base_folder, name)).st_mtime_ns)
+             for name in ('餐费', '交通')}
+    assert after == before
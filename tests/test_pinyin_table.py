@@ -0,0 +1,33 @@
+from pypinyin import pinyin, Style
+from pinyin_table import first_letter, GB2312_LEVEL1_START, GB2312_LEVEL1_END
+
+# GB2312 按常用读音编码，以下多音字的首字母与 pypinyin 的默认读音不同：汉字 -> (查表结果, pypinyin)
+ACCEPTED_DIFFERENCES = {
+    '辟': ('b', 'p'), '泊': ('b', 'p'), '长': ('c', 'z'), '匙': ('c', 's'), '脯': ('f', 'p'),
+    '蛤': ('g', 'h'), '槛': ('j', 'k'), '咯': ('k', 'g'), '傀': ('k', 'g'), '茄': ('q', 'j'),
+    '炔': ('q', 'g'), '伺': ('s', 'c'), '厦': ('x', 's'), '畜': ('x', 'c'), '吁': ('y', 'x'),
+    '曾': ('z', 'c'), '轧': ('z', 'y'), '辗': ('z', 'n'), '椎': ('z', 'c'),
+}
+
+def _level1_chars():
+    for code in range(GB2312_LEVEL1_START, GB2312_LEVEL1_END + 1):
+        try:
+            yield bytes([code >> 8, code & 0xFF]).decode('gb2312')
+        except UnicodeDecodeError:
+            # 每个区的 0xFF 及以后不是有效编码
+            continue
+
+def test_level1_table_matches_pypinyin():
+    chars = list(_level1_chars())
+    assert len(chars) == 3755
+
+    differences = {}
+    for char in chars:
+        expected = pinyin(char, style=Style.FIRST_LETTER)[0][0].lower()
+        if first_letter(char) != expected:
+            differences[char] = (first_letter(char), expected)
+    assert differences == ACCEPTED_DIFFERENCES
+
+def test_rare_characters_fall_back_to_pypinyin():
+    # 不在一级字库中的汉字
+    assert first_letter('瓒') == 'z'
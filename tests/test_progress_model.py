@@ -0,0 +1,28 @@
+from progress_model import ProgressModel
+
+def _entries(count):
+    return [
+        (f'/项目/{i}', {
+            'valid': i % 7 != 0,
+            'cost': {'memory': 0, 'cpu': 0, 'invoice_pages': 1 + i % 3,
+                     'collage_pixels': 2e6 * (i % 5), 'special_pixels': [1e6] * (i % 2)},
+        })
+        for i in range(count)
+    ]
+
+def test_running_totals_match_per_folder_predictions():
+    model = ProgressModel(_entries(300))
+    for i in range(0, 300, 3):
+        model.complete(i, {'invoice': 0.3, 'collage': 0.1, 'special': 0.02})
+
+    predicted = [model.predicted_seconds(i) for i in range(300)]
+    done_work, total_work = model._work()
+    assert abs(total_work - sum(predicted)) < 1e-6
+    assert abs(done_work - sum(p for p, done in zip(predicted, model.done) if done)) < 1e-6
+
+def test_progress_reaches_one_when_all_folders_complete():
+    model = ProgressModel(_entries(50))
+    for i in range(50):
+        model.complete(i, {'invoice': 0.2})
+    assert model.progress() == 1.0
+    assert model.end_time is not None
@@ -0,0 +1,66 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import scheduler
+from scheduler import MemoryBudgetScheduler
+
+MB = 1024 * 1024
+
+def _entries(memories):
+    """生成带有估算开销缓存的清单条目，调度时不读取文件"""
+    return [(f'/project/{i}', {'valid': True, 'cost': {'memory': memory}})
+            for i, memory in enumerate(memories)]
+
+class _FakeRender:
+    """代替工作进程中的 render_folder，按指定耗时完成并记录同时运行的任务"""
+
+    def __init__(self, memories, delays):
+        self.memories = memories
+        self.delays = delays
+        self.running = set()
+        self.started = []  # (序号, 开始时同时运行的任务序号)
+        self.finished = []
+        self._lock = threading.Lock()
+
+    def __call__(self, folder_path, entry, debug_mode=False, image_placement=False):
+        index = int(folder_path.rsplit('/', 1)[1])
+        with self._lock:
+            self.running.add(index)
+            self.started.append((index, set(self.running)))
+        time.sleep(self.delays[index])
+        with self._lock:
+            self.running.discard(index)
+            self.finished.append(index)
+        return True, b'%PDF', [], {}
+
+def test_results_follow_input_order_when_workers_finish_out_of_order(monkeypatch):
+    memories = [100 * MB] * 4
+    fake = _FakeRender(memories, [0.3, 0.2, 0.1, 0.0])
+    monkeypatch.setattr(scheduler, 'render_folder', fake)
+
+    folder_entries = _entries(memories)
+    run = MemoryBudgetScheduler(1024 * MB, 4, executor_factory=ThreadPoolExecutor)
+    emitted = [folder_path for folder_path, result in run.run(folder_entries)]
+
+    assert fake.finished == [3, 2, 1, 0]
+    assert emitted == [folder_path for folder_path, _ in folder_entries]
+
+def test_work_is_admitted_against_the_memory_budget(monkeypatch):
+    budget = 1000 * MB
+    # 第4个文件夹单独就超出预算
+    memories = [400 * MB, 400 * MB, 400 * MB, 1500 * MB, 100 * MB]
+    fake = _FakeRender(memories, [0.05] * len(memories))
+    monkeypatch.setattr(scheduler, 'render_folder', fake)
+
+    run = MemoryBudgetScheduler(budget, 4, executor_factory=ThreadPoolExecutor)
+    results = list(run.run(_entries(memories)))
+    assert len(results) == len(memories)
+
+    for index, running in fake.started:
+        if index == 3:
+            # 超出预算的文件夹等其他任务全部完成后单独处理
+            assert running == {3}
+        else:
+            assert sum(memories[i] for i in running) <= budget
+    # 预算只允许两个400MB的文件夹同时处理
+    assert max(len(running) for _, running in fake.started) == 2
@@ -0,0 +1,80 @@
+import os
+import sys
+import stat
+import threading
+import urllib.error
+import urllib.request
+import pytest
+import service
+from http.server import ThreadingHTTPServer
+
+class _FakeService:
+    """只记录提交的任务，不实际处理"""
+    debug_mode = False
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, params):
+        self.submitted.append(params)
+        job = service.Job(params)
+        job.emit('done', output_files=[])
+        return job
+
+    def get(self, job_id):
+        return None
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer((service.DEFAULT_HOST, 0), service.ServiceRequestHandler)
+    httpd.daemon_threads = True
+    httpd.service = _FakeService()
+    httpd.token = 'secret-token'
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def _post(httpd, headers, body=b'{"base_folder": "/tmp"}'):
+    url = f'http://127.0.0.1:{httpd.server_address[1]}/jobs'
+    request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_accepts_authorized_json_request(server):
+    headers = {'Content-Type': 'application/json', 'Authorization': 'Bearer secret-token'}
+    assert _post(server, headers) == 202
+    assert server.service.submitted == [{'base_folder': '/tmp'}]
+
+@pytest.mark.parametrize('headers, status', [
+    ({'Content-Type': 'application/json'}, 401),
+    ({'Content-Type': 'application/json', 'Authorization': 'Bearer wrong'}, 401),
+    ({'Content-Type': 'text/plain', 'Authorization': 'Bearer secret-token'}, 415),
+    ({'Content-Type': 'application/json', 'Authorization': 'Bearer secret-token', 'Host': 'evil.example:8765'}, 403),
+])
+def test_rejects_cross_site_requests(server, headers, status):
+    assert _post(server, headers) == status
+    assert server.service.submitted == []
+
+def test_service_info_is_private(tmp_path):
+    path = str(tmp_path / 'service.json')
+    service.write_service_info('http://127.0.0.1:8765', 'token', path)
+    assert service.load_service_info(path) == ('http://127.0.0.1:8765', 'token')
+    if sys.platform != 'win32':
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+def test_submit_rejects_existing_output_without_overwrite(tmp_path):
+    output = tmp_path / 'out.pdf'
+    output.write_bytes(b'%PDF-1.7')
+    render_service = service.RenderService(workers=1)
+    try:
+        with pytest.raises(ValueError, match='已存在'):
+            render_service.submit({'base_folder': str(tmp_path), 'output': str(output)})
+        assert render_service.jobs == {}
+        job = render_service.submit({'base_folder': str(tmp_path), 'output': str(output), 'overwrite': True})
+        assert job.status == 'queued'
+    finally:
+        render_service.close()
@@ -0,0 +1,27 @@
+import os
+import shutil
+import fitz  # PyMuPDF
+from pdf_merger import PDFMerger
+from navigation import read_section_records
+
+def test_update_reports_progress_for_rerendered_folders(tmp_path, make_project):
+    base_folder = make_project(('餐费', '交通', '住宿'))
+    output_pdf = PDFMerger().process_all_subfolders_to_total_pdf(base_folder, str(tmp_path / 'out.pdf'))[0]
+    with fitz.open(output_pdf) as doc:
+        page_count = doc.page_count
+
+    # 修改一个子文件夹：增加一张NEWPAGE图片
+    folder = os.path.join(base_folder, '交通')
+    shutil.copy(os.path.join(folder, '截图0.png'), os.path.join(folder, 'NEWPAGE补充.png'))
+
+    merger = PDFMerger()
+    reported = []
+    merger.progress_callback = lambda folder_path, done, total: reported.append(
+        (os.path.basename(folder_path), done, total, merger.progress_model.progress()))
+    assert merger.update_output(base_folder, output_pdf) == 1
+    assert reported == [('交通', 1, 1, 1.0)]
+
+    with fitz.open(output_pdf) as doc:
+        records = read_section_records(doc)
+        assert sorted(record['folder'] for record in records) == sorted(['餐费', '交通', '住宿'])
+        assert doc.page_count == sum(record['count'] for record in records) == page_count + 1